@@ -0,0 +1,359 @@
+from __future__ import annotations
+
+"""
+Report the TIAN level needed to read a Chinese text corpus.
+
+Text is streamed in fixed-size chunks and segmented by longest match against
+a trie built from the vocabulary CSV's ``vocab`` column; characters no word
+covers fall back to their hanzi ``tian_level``, and each run of them is
+reported as an unknown word. Large files are split into newline-aligned byte
+ranges and analysed across worker processes.
+
+    python analyze_corpus.py corpus.txt --target 0.98 --json
+"""
+
+import argparse
+import codecs
+import csv
+import json
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+from build_hsk_vocab_csv import load_hanzi_levels, normalize_vocab_key, tian_level_from_chars
+from hsk_csv_utils import HANZI_CSV_PATH, VOCAB_CSV_PATH, default_workers
+
+# Byte ranges handed to each worker; small enough to balance, large enough to amortise.
+CHUNK_BYTES = 8 << 20
+# Read size within a range (bytes for files, characters for stdin).
+READ_SIZE = 1 << 16
+# Key marking the end of a word in the trie; no hanzi is empty.
+WORD_END = ""
+
+
+def is_hanzi(ch: str) -> bool:
+    cp = ord(ch)
+    return (
+        0x4E00 <= cp <= 0x9FFF
+        or 0x3400 <= cp <= 0x4DBF
+        or 0x20000 <= cp <= 0x2EBEF
+        or 0xF900 <= cp <= 0xFAFF
+    )
+
+
+def build_trie(words: Dict[str, int]) -> Dict[str, object]:
+    """Nested-dict trie mapping each word to its level under WORD_END."""
+    root: Dict[str, object] = {}
+    for word, level in words.items():
+        node = root
+        for ch in word:
+            node = node.setdefault(ch, {})  # type: ignore[assignment]
+        node[WORD_END] = level
+    return root
+
+
+def trie_depth(trie: Dict[str, object]) -> int:
+    """Length of the longest word in the trie."""
+    depth, level = 0, [trie]
+    while True:
+        level = [child for node in level for key, child in node.items() if key != WORD_END]  # type: ignore[union-attr]
+        if not level:
+            return depth
+        depth += 1
+
+
+def longest_matches(trie: Dict[str, object], text: str) -> Iterator[Tuple[str, Optional[int]]]:
+    """Yield (segment, word level) using the same segmentation as Analyzer.feed.
+
+    Hanzi no word covers come out one at a time with a level of None;
+    non-hanzi characters are skipped. Analyzer.feed keeps its own inlined
+    copy of this loop, which is its hot path.
+    """
+    i, n = 0, len(text)
+    while i < n:
+        if not is_hanzi(text[i]):
+            i += 1
+            continue
+        node = trie
+        match_len, match_level = 0, None
+        j = i
+        while j < n:
+            node = node.get(text[j])  # type: ignore[assignment]
+            if node is None:
+                break
+            j += 1
+            if WORD_END in node:
+                match_len, match_level = j - i, node[WORD_END]
+        if match_len:
+            yield text[i : i + match_len], match_level  # type: ignore[misc]
+            i += match_len
+        else:
+            yield text[i], None
+            i += 1
+
+
+def load_vocab_levels(path: Path, hanzi_levels: Dict[str, int]) -> Dict[str, int]:
+    """Map each vocab word (sense digits dropped) to its lowest tian_level."""
+    levels: Dict[str, int] = {}
+    if not path.exists():
+        return levels
+    with path.open(encoding="utf-8") as handle:
+        for row in csv.DictReader(handle):
+            word = normalize_vocab_key((row.get("vocab") or "").strip())
+            if not word:
+                continue
+            try:
+                level = int(row.get("tian_level", ""))
+            except ValueError:
+                level = tian_level_from_chars(word, hanzi_levels, int(row.get("hsk_level") or 1))
+            if word not in levels or level < levels[word]:
+                levels[word] = level
+    return levels
+
+
+class Analyzer:
+    """Segments text and accumulates per-level character counts.
+
+    Text may arrive in arbitrary chunks: the last ``max_word_len - 1``
+    characters of a non-final chunk are held back so a word spanning the
+    boundary still matches, and an unmatched run stays open across chunks.
+    """
+
+    def __init__(self, trie: Dict[str, object], hanzi_levels: Dict[str, int], max_word_len: Optional[int] = None) -> None:
+        self.trie = trie
+        self.hanzi_levels = hanzi_levels
+        self.max_word_len = trie_depth(trie) if max_word_len is None else max_word_len
+        self.level_chars: Counter = Counter()
+        self.matched_words: Counter = Counter()
+        self.fallback_chars = 0
+        self.unknown: Counter = Counter()
+        self.unknown_words: Counter = Counter()
+        self.total_chars = 0
+        self._carry = ""
+        self._run: List[str] = []
+
+    def _end_run(self) -> None:
+        if self._run:
+            self.unknown_words["".join(self._run)] += 1
+            self._run.clear()
+
+    def feed(self, text: str, final: bool = True) -> None:
+        """Segment ``text``; pass ``final=False`` when more of the stream follows."""
+        trie = self.trie
+        hanzi_levels = self.hanzi_levels
+        level_chars = self.level_chars
+        run = self._run
+        if self._carry:
+            text = self._carry + text
+        i, n = 0, len(text)
+        # A match starting before ``limit`` lies wholly inside ``text``; with
+        # an empty vocabulary there is nothing to hold back.
+        limit = n if final else n - max(self.max_word_len, 1) + 1
+        while i < limit:
+            ch = text[i]
+            if not is_hanzi(ch):
+                if run:
+                    self._end_run()
+                i += 1
+                continue
+            # Longest vocabulary match starting at i.
+            node = trie
+            match_len, match_level = 0, None
+            j = i
+            while j < n:
+                node = node.get(text[j])  # type: ignore[assignment]
+                if node is None:
+                    break
+                j += 1
+                if WORD_END in node:
+                    match_len, match_level = j - i, node[WORD_END]
+            if match_len:
+                if run:
+                    self._end_run()
+                level_chars[match_level] += match_len
+                self.matched_words[match_level] += 1
+                self.total_chars += match_len
+                i += match_len
+                continue
+            self.total_chars += 1
+            run.append(ch)
+            level = hanzi_levels.get(ch)
+            if level is None:
+                self.unknown[ch] += 1
+            else:
+                level_chars[level] += 1
+                self.fallback_chars += 1
+            i += 1
+        self._carry = text[i:]
+        if final:
+            self._end_run()
+
+    def merge(self, other: "Analyzer") -> None:
+        self.level_chars.update(other.level_chars)
+        self.matched_words.update(other.matched_words)
+        self.fallback_chars += other.fallback_chars
+        self.unknown.update(other.unknown)
+        self.unknown_words.update(other.unknown_words)
+        self.total_chars += other.total_chars
+
+    def state(self) -> Tuple[Counter, Counter, int, Counter, Counter, int]:
+        return (
+            self.level_chars,
+            self.matched_words,
+            self.fallback_chars,
+            self.unknown,
+            self.unknown_words,
+            self.total_chars,
+        )
+
+    def load_state(self, state: Tuple[Counter, Counter, int, Counter, Counter, int]) -> None:
+        (
+            self.level_chars,
+            self.matched_words,
+            self.fallback_chars,
+            self.unknown,
+            self.unknown_words,
+            self.total_chars,
+        ) = state
+
+    def report(self, target: float, top_unknown: int) -> Dict[str, object]:
+        total = self.total_chars
+        coverage: Dict[str, float] = {}
+        required: Optional[int] = None
+        cumulative = 0
+        for level in sorted(self.level_chars):
+            cumulative += self.level_chars[level]
+            share = cumulative / total if total else 0.0
+            coverage[str(level)] = round(100 * share, 3)
+            if required is None and share >= target:
+                required = level
+        unknown_chars = sum(self.unknown.values())
+        return {
+            "total_hanzi": total,
+            "required_level": required,
+            "target_coverage": target,
+            "max_level_seen": max(self.level_chars) if self.level_chars else None,
+            "cumulative_coverage_pct": coverage,
+            "chars_per_level": {str(k): v for k, v in sorted(self.level_chars.items())},
+            "words_matched": sum(self.matched_words.values()),
+            "fallback_chars": self.fallback_chars,
+            "unknown_pct": round(100 * unknown_chars / total, 3) if total else 0.0,
+            "unknown": self.unknown.most_common(top_unknown),
+            "unknown_words": self.unknown_words.most_common(top_unknown),
+        }
+
+
+_WORKER: Optional[Analyzer] = None
+
+
+def load_analyzer(vocab_path: Path = VOCAB_CSV_PATH, hanzi_path: Path = HANZI_CSV_PATH) -> Analyzer:
+    hanzi_levels = load_hanzi_levels(hanzi_path)
+    return Analyzer(build_trie(load_vocab_levels(vocab_path, hanzi_levels)), hanzi_levels)
+
+
+def init_worker(vocab_path: Path, hanzi_path: Path) -> None:
+    global _WORKER
+    _WORKER = load_analyzer(vocab_path, hanzi_path)
+
+
+def analyze_range(path: Path, start: int, end: int, analyzer: Optional[Analyzer] = None):
+    """Analyse the byte range [start, end) of ``path``, READ_SIZE bytes at a time."""
+    if analyzer is None:
+        analyzer = Analyzer(_WORKER.trie, _WORKER.hanzi_levels, _WORKER.max_word_len)  # type: ignore[union-attr]
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    with path.open("rb") as handle:
+        handle.seek(start)
+        pos = start
+        while pos < end:
+            data = handle.read(min(READ_SIZE, end - pos))
+            if not data:
+                break
+            pos += len(data)
+            analyzer.feed(decoder.decode(data), final=False)
+    analyzer.feed(decoder.decode(b"", final=True))
+    return analyzer.state()
+
+
+def chunk_ranges(path: Path, chunk_bytes: int = CHUNK_BYTES) -> List[Tuple[int, int]]:
+    """Split a file into byte ranges that each end just after a newline."""
+    size = path.stat().st_size
+    ranges: List[Tuple[int, int]] = []
+    with path.open("rb") as handle:
+        start = 0
+        while start < size:
+            end = min(start + chunk_bytes, size)
+            if end < size:
+                handle.seek(end)
+                handle.readline()
+                end = handle.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def analyze_file(path: Path, workers: Optional[int] = None, chunk_bytes: int = CHUNK_BYTES) -> Analyzer:
+    total = load_analyzer()
+    ranges = chunk_ranges(path, chunk_bytes)
+    workers = default_workers() if workers is None else workers
+    if workers <= 1 or len(ranges) <= 1:
+        for start, end in ranges:
+            analyze_range(path, start, end, total)
+        return total
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(ranges)),
+        initializer=init_worker,
+        initargs=(VOCAB_CSV_PATH, HANZI_CSV_PATH),
+    ) as pool:
+        futures = [pool.submit(analyze_range, path, start, end) for start, end in ranges]
+        for future in futures:
+            part = Analyzer(total.trie, total.hanzi_levels, total.max_word_len)
+            part.load_state(future.result())
+            total.merge(part)
+    return total
+
+
+def analyze_stream(handle: TextIO) -> Analyzer:
+    analyzer = load_analyzer()
+    for chunk in iter(lambda: handle.read(READ_SIZE), ""):
+        analyzer.feed(chunk, final=False)
+    analyzer.feed("")
+    return analyzer
+
+
+def run_analysis(
+    corpus: Path, target: float = 0.98, top_unknown: int = 50, workers: Optional[int] = None, as_json: bool = False
+) -> None:
+    """Analyse ``corpus`` ('-' for stdin) and print the report."""
+    if str(corpus) == "-":
+        import sys
+
+        analyzer = analyze_stream(sys.stdin)
+    else:
+        analyzer = analyze_file(corpus, workers)
+    report = analyzer.report(target, top_unknown)
+    if as_json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+    print(f"Hanzi analysed: {report['total_hanzi']}")
+    print(f"Required TIAN level for {target:.0%} coverage: {report['required_level'] or 'not reached'}")
+    for level, pct in report["cumulative_coverage_pct"].items():
+        print(f"  <= level {level:>2}: {pct:6.2f}%")
+    print(f"Unknown: {report['unknown_pct']:.2f}% ({', '.join(ch for ch, _ in report['unknown'][:20])})")
+    print(f"Unknown words: {', '.join(word for word, _ in report['unknown_words'][:20]) or 'none'}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report the TIAN level needed to read a Chinese corpus.")
+    parser.add_argument("corpus", type=Path, help="UTF-8 text file ('-' for stdin).")
+    parser.add_argument("--target", type=float, default=0.98, help="Coverage fraction that counts as readable.")
+    parser.add_argument("--top-unknown", type=int, default=50, help="How many unknown characters and words to list.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON.")
+    args = parser.parse_args()
+
+    run_analysis(args.corpus, args.target, args.top_unknown, args.workers, args.json)
+
+
+if __name__ == "__main__":
+    main()
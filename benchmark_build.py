@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+"""
+Offline benchmarks for the CSV build stages.
+
+Generates synthetic HSK-shaped inputs (hanzi lists, word lists and Anki TSVs
+with HTML) at several scales, runs each stage against them with a fake
+decomposer/dictionary, and reports wall time, peak traced memory and
+throughput. When pandas is installed the vectorized hanzi/vocabulary paths
+are timed too and their CSVs checked byte-for-byte against the row-by-row
+ones. Results can be saved as a baseline JSON and compared against it.
+
+    python benchmark_build.py --scales 1,10,100 --save-baseline
+    python benchmark_build.py --compare
+"""
+
+import argparse
+import contextlib
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import build_hsk_hanzi_csv
+import build_hsk_vocab_csv
+import build_radicals_csv
+import hsk_csv_utils
+import stroke_counts
+from hsk_csv_utils import CACHE_DIR, LEVELS, PINYIN_FINALS, PINYIN_INITIALS, tian_levels
+
+# Machine-specific timings, so kept with the other untracked build caches.
+BASELINE_PATH = CACHE_DIR / "bench_baseline.json"
+
+# Real HSK 1-3 sizes; scale 1 mirrors them.
+BASE_HANZI_PER_LEVEL = {1: 246, 2: 125, 3: 284}
+BASE_WORDS_PER_LEVEL = {1: 300, 2: 204, 3: 507}
+COMPONENT_POOL = [chr(cp) for cp in range(0x2F00, 0x2FD6)]  # Kangxi radicals
+HANZI_BLOCKS = [(0x4E00, 0x9FFF), (0x3400, 0x4DBF), (0x20000, 0x2A6DF)]
+
+
+def hanzi_codepoints() -> Iterator[str]:
+    for start, end in HANZI_BLOCKS:
+        for cp in range(start, end + 1):
+            yield chr(cp)
+
+
+class FakeDecomposer:
+    def __init__(self, components: Dict[str, List[str]]) -> None:
+        self.components = components
+
+    def decompose(self, hanzi: str, decomposition_type=None):
+        return {"character": hanzi, "components": list(self.components.get(hanzi, [hanzi]))}
+
+    def get_radical_meaning(self, radical: str) -> str:
+        return f"radical {ord(radical):x}"
+
+
+class FakeDictionary:
+    def __init__(self, pinyins: Dict[str, List[str]]) -> None:
+        self.pinyins = pinyins
+
+    def definition_lookup(self, hanzi: str):
+        return [
+            {"simplified": hanzi, "traditional": hanzi, "pinyin": p, "definition": "synthetic"}
+            for p in self.pinyins.get(hanzi, [])
+        ]
+
+    def get_pinyin(self, hanzi: str) -> List[str]:
+        return []
+
+
+class Dataset:
+    def __init__(self, root: Path, scale: int, seed: int = 0) -> None:
+        rng = random.Random(seed)
+        syllables = [i + f for i in PINYIN_INITIALS for f in PINYIN_FINALS[:20] if i + f]
+        chars = hanzi_codepoints()
+        self.root = root
+        self.hanzi_dir = root / "HSK Hanzi"
+        self.words_dir = root / "HSK Words"
+        self.anki_dir = root / "Anki xiehanzi"
+        self.output_dir = root / "output"
+        for path in (self.hanzi_dir, self.words_dir, self.anki_dir, self.output_dir):
+            path.mkdir(parents=True, exist_ok=True)
+
+        self.components: Dict[str, List[str]] = {}
+        self.pinyins: Dict[str, List[str]] = {}
+        self.pinyin_samples: List[str] = []
+        hanzi_by_level: Dict[int, List[str]] = {}
+        for level in LEVELS:
+            hanzi = [next(chars) for _ in range(BASE_HANZI_PER_LEVEL.get(level, 250) * scale)]
+            hanzi_by_level[level] = hanzi
+            for ch in hanzi:
+                self.components[ch] = rng.sample(COMPONENT_POOL, rng.randint(1, 4))
+                readings = [f"{rng.choice(syllables)}{rng.randint(1, 5)}" for _ in range(rng.randint(1, 2))]
+                self.pinyins[ch] = readings
+                self.pinyin_samples.extend(readings)
+            (self.hanzi_dir / f"HSK_Level_{level}_hanzi.txt").write_text("\n".join(hanzi) + "\n", encoding="utf-8")
+
+        all_hanzi = [ch for level in LEVELS for ch in hanzi_by_level[level]]
+        self.word_count = 0
+        for level in LEVELS:
+            words = [
+                "".join(rng.choice(all_hanzi) for _ in range(rng.randint(1, 3)))
+                for _ in range(BASE_WORDS_PER_LEVEL.get(level, 400) * scale)
+            ]
+            self.word_count += len(words)
+            (self.words_dir / f"HSK_Level_{level}_words.txt").write_text("\n".join(words) + "\n", encoding="utf-8")
+            lines = []
+            for word in words:
+                numbered = " ".join(rng.choice(self.pinyins[ch]) for ch in word)
+                meanings = "".join(f"<li>meaning {i} of <b>{word}</b> &amp; more</li>" for i in range(rng.randint(1, 4)))
+                html = f'<span class="pinYinWrapper">{numbered}</span> <ul>{meanings}</ul>'
+                lines.append("\t".join([word, word, numbered, "", "", "", "", html]))
+            (self.anki_dir / f"HSK_Level_{level}.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+        self.hanzi_count = len(all_hanzi)
+
+    @contextlib.contextmanager
+    def installed(self) -> Iterator[None]:
+        """Point the stage modules at this dataset's directories and stroke cache."""
+        patches = [
+            (build_radicals_csv, "HANZI_DIR", self.hanzi_dir),
+            (build_hsk_hanzi_csv, "HANZI_DIR", self.hanzi_dir),
+            (build_hsk_vocab_csv, "WORDS_DIR", self.words_dir),
+            (build_hsk_vocab_csv, "ANKI_DIR", self.anki_dir),
+            (hsk_csv_utils, "OUTPUT_DIR", self.output_dir),
+            (stroke_counts, "STROKE_CACHE_PATH", self.root / "stroke_counts.json"),
+        ]
+        saved = [(module, name, getattr(module, name)) for module, name, _ in patches]
+        for module, name, value in patches:
+            setattr(module, name, value)
+        try:
+            yield
+        finally:
+            for module, name, value in saved:
+                setattr(module, name, value)
+
+
+def measure(func: Callable[[], object], repeat: int) -> Tuple[float, float, object]:
+    """Return (best wall seconds, peak traced MiB, last result)."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / (1024 * 1024), result
+
+
+def run_scale(scale: int, repeat: int, workers: Optional[int]) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+    with tempfile.TemporaryDirectory(prefix="tian-bench-") as tmp:
+        data = Dataset(Path(tmp), scale)
+        decomposer = FakeDecomposer(data.components)
+        dictionary = FakeDictionary(data.pinyins)
+
+        def record(stage: str, items: int, func: Callable[[], object]) -> object:
+            seconds, peak_mb, result = measure(func, repeat)
+            results[stage] = {
+                "seconds": round(seconds, 4),
+                "peak_mb": round(peak_mb, 2),
+                "items": items,
+                "items_per_s": round(items / seconds, 1) if seconds else 0.0,
+            }
+            return result
+
+        with data.installed():
+            radicals = record(
+                "radicals",
+                data.hanzi_count,
+                lambda: build_radicals_csv.build_radicals_csv(decomposer=decomposer, workers=workers),
+            )
+            hanzi = record(
+                "hanzi",
+                data.hanzi_count,
+                lambda: build_hsk_hanzi_csv.build_hanzi_csv(
+                    radical_levels=tian_levels(radicals, "radical"),
+                    decomposer=decomposer,
+                    dictionary=dictionary,
+                    workers=workers,
+                    vectorized=False,
+                ),
+            )
+            hanzi_levels = tian_levels(hanzi, "hanzi")
+            record(
+                "vocabulary",
+                data.word_count,
+                lambda: build_hsk_vocab_csv.build_vocabulary_csv(
+                    hanzi_levels=hanzi_levels, workers=workers, vectorized=False
+                ),
+            )
+            if find_spec("pandas") is not None:
+                row_outputs = {path.name: path.read_bytes() for path in data.output_dir.glob("*.csv")}
+                record(
+                    "hanzi_vectorized",
+                    data.hanzi_count,
+                    lambda: build_hsk_hanzi_csv.build_hanzi_csv(
+                        radical_levels=tian_levels(radicals, "radical"),
+                        decomposer=decomposer,
+                        dictionary=dictionary,
+                        workers=workers,
+                        vectorized=True,
+                    ),
+                )
+                record(
+                    "vocabulary_vectorized",
+                    data.word_count,
+                    lambda: build_hsk_vocab_csv.build_vocabulary_csv(
+                        hanzi_levels=hanzi_levels, workers=workers, vectorized=True
+                    ),
+                )
+                for name, content in row_outputs.items():
+                    if (data.output_dir / name).read_bytes() != content:
+                        raise SystemExit(f"{scale}x: vectorized {name} differs from the row-by-row output")
+            record(
+                "pinyin",
+                len(data.pinyin_samples),
+                lambda: [hsk_csv_utils.numbered_pinyin_to_tone_marks(p) for p in data.pinyin_samples],
+            )
+    return results
+
+
+def compare(current: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """Return a message per stage that got slower than baseline * (1 + tolerance)."""
+    regressions: List[str] = []
+    for scale, stages in current.items():
+        for stage, stats in stages.items():
+            before = baseline.get(scale, {}).get(stage)
+            if not before or not before.get("seconds"):
+                continue
+            ratio = stats["seconds"] / before["seconds"]
+            if ratio > 1 + tolerance:
+                regressions.append(
+                    f"{scale}x {stage}: {before['seconds']:.4f}s -> {stats['seconds']:.4f}s ({ratio:.2f}x)"
+                )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the TIAN build stages on synthetic data.")
+    parser.add_argument("--scales", default="1,10,100", help="Comma-separated dataset scales (default: 1,10,100).")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage; the best is reported.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes passed to the stages.")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="Baseline JSON path.")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results to the baseline file.")
+    parser.add_argument("--compare", action="store_true", help="Fail if a stage is slower than the baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before failing (0.25 = 25%%).")
+    args = parser.parse_args()
+
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for scale in [int(s) for s in args.scales.split(",") if s.strip()]:
+        results[str(scale)] = run_scale(scale, args.repeat, args.workers)
+        for stage, stats in results[str(scale)].items():
+            print(
+                f"{scale:>4}x {stage:<21} {stats['seconds']:>9.4f}s {stats['peak_mb']:>9.2f} MiB "
+                f"{stats['items_per_s']:>12.1f} items/s"
+            )
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+        print(f"Saved baseline to {args.baseline}")
+    if args.compare:
+        if not args.baseline.exists():
+            raise SystemExit(f"No baseline at {args.baseline}; run with --save-baseline first.")
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,16 +2,270 @@ from __future__ import annotations
 
 # Thin orchestrator to run all CSV generators in dependency order.
 
+import argparse
+import ast
+from functools import cached_property
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+
+from build_profile import PROFILER, configure
 from build_radicals_csv import build_radicals_csv
-from build_hsk_hanzi_csv import build_hanzi_csv
-from build_hsk_vocab_csv import build_vocabulary_csv
+from build_hsk_hanzi_csv import build_hanzi_csv, create_dictionary, load_hanzipy
+from build_hsk_vocab_csv import anki_sources, build_vocabulary_csv
+from hanzipy_cache import CachedDecomposer, CachedDictionary, hanzipy_version, read_json, write_json
+from hsk_csv_utils import (
+    BASE_DIR,
+    CACHE_DIR,
+    LEVELS,
+    MNEMONICS_PATH,
+    default_workers,
+    file_digest,
+    hanzi_sources,
+    output_path,
+    parse_levels,
+    tian_levels,
+    word_sources,
+)
+from row_changelog import record_table
+from stroke_counts import StrokeTable, strokes_version
 
+if TYPE_CHECKING:  # pragma: no cover
+    from pandas import DataFrame
+
+MANIFEST_PATH = CACHE_DIR / "build_manifest.json"
+STAGES = ("radicals", "hanzi", "vocabulary")
+
+# A stage's table: records, or a DataFrame on the vectorized path.
+Rows = Union[List[Dict[str, object]], "DataFrame"]
+
+
+class SharedHanzipy:
+    """hanzipy objects shared by all stages, built on first use.
+
+    Stages skipped by the manifest never touch these, so a no-op rebuild
+    neither imports hanzipy nor reads its snapshot or the stroke cache.
+    """
+
+    @cached_property
+    def decomposer(self) -> CachedDecomposer:
+        return CachedDecomposer(lambda: load_hanzipy()[0]())
+
+    @cached_property
+    def dictionary(self) -> CachedDictionary:
+        return create_dictionary()
+
+    @cached_property
+    def strokes(self) -> StrokeTable:
+        return StrokeTable()
+
+
+def module_imports(path: Path, digest: str, graph: Dict[str, object]) -> List[str]:
+    """Modules imported by one source file, function-local imports included.
+
+    ``graph`` (the manifest's "imports" entry) keeps each file's imports
+    under its digest, so only edited files are parsed again.
+    """
+    cached = graph.get(path.name)
+    if isinstance(cached, dict) and cached.get("digest") == digest:
+        return list(cached.get("imports") or [])
+    imports: List[str] = []
+    for node in ast.walk(ast.parse(path.read_text(encoding="utf-8"))):
+        if isinstance(node, ast.Import):
+            imports.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            imports.append(node.module)
+    graph[path.name] = {"digest": digest, "imports": imports}
+    return imports
+
+
+def stage_code(module: str, graph: Dict[str, object]) -> Dict[str, str]:
+    """Digests of ``module`` and every repo module it imports, transitively.
+
+    A stage's manifest entry therefore changes whenever any code it can run
+    changes.
+    """
+    found: Dict[str, str] = {}
+    pending = [module]
+    while pending:
+        path = BASE_DIR / f"{pending.pop()}.py"
+        if str(path) in found or not path.exists():
+            continue
+        digest = found[str(path)] = file_digest(path)
+        pending.extend(module_imports(path, digest, graph))
+    return dict(sorted(found.items()))
+
+
+def stage_inputs(sources: List[Path], code: Dict[str, str], **extra: str) -> Dict[str, str]:
+    """Content digests of everything a stage reads, including its own code."""
+    inputs = {str(path): file_digest(path) for path in sources}
+    inputs.update(code)
+    inputs.update(extra)
+    return inputs
+
+
+def manifest_inputs(stage: str, levels: List[int], graph: Dict[str, object]) -> Dict[str, str]:
+    """Everything the manifest entry of ``stage`` ("radicals", "hanzi" or "vocabulary") is keyed on."""
+    if stage == "radicals":
+        return stage_inputs(
+            hanzi_sources(levels),
+            stage_code("build_radicals_csv", graph),
+            hanzipy=hanzipy_version(),
+            strokes=strokes_version(),
+        )
+    if stage == "hanzi":
+        return stage_inputs(
+            [*hanzi_sources(levels), output_path("radicals", levels), MNEMONICS_PATH],
+            stage_code("build_hsk_hanzi_csv", graph),
+            hanzipy=hanzipy_version(),
+            strokes=strokes_version(),
+        )
+    return stage_inputs(
+        [*word_sources(levels), *anki_sources(levels), output_path("hanzi", levels), MNEMONICS_PATH],
+        stage_code("build_hsk_vocab_csv", graph),
+    )
+
+
+def import_graph(manifest: Dict[str, object]) -> Dict[str, object]:
+    graph = manifest.get("imports")
+    if not isinstance(graph, dict):
+        graph = manifest["imports"] = {}
+    return graph
+
+
+def record_stages(levels: List[int], stages: Tuple[str, ...] = STAGES) -> None:
+    """Refresh manifest entries for tables written outside run_pipeline (e.g. by watch mode)."""
+    manifest = read_json(MANIFEST_PATH) or {}
+    graph = import_graph(manifest)
+    for stage in stages:
+        manifest[stage] = {
+            "inputs": manifest_inputs(stage, levels, graph),
+            "output": file_digest(output_path(stage, levels)),
+        }
+    write_json(manifest, MANIFEST_PATH)
+
+
+def is_up_to_date(manifest: Dict[str, object], stage: str, inputs: Dict[str, str], output: Path) -> bool:
+    entry = manifest.get(stage)
+    if not isinstance(entry, dict) or not output.exists():
+        return False
+    return entry.get("inputs") == inputs and entry.get("output") == file_digest(output)
+
+
+def run_pipeline(
+    write: bool = True,
+    force: bool = False,
+    levels: List[int] = LEVELS,
+    workers: Optional[int] = None,
+    vectorized: Optional[bool] = None,
+) -> Dict[str, Optional[Rows]]:
+    """Run every stage in one process, handing result tables over in memory.
+
+    hanzipy objects are built once and shared; CSV writing is the optional
+    final sink rather than the handoff between stages. When writing, stages
+    whose inputs match the build manifest are skipped (their table is
+    returned as None) unless ``force`` is set. With more than one worker,
+    per-level work runs in a process pool and each worker loads its own
+    hanzipy objects. ``vectorized`` switches the hanzi and vocabulary stages
+    to the pandas path (default: TIAN_VECTORIZED).
+    """
+    incremental = write and not force
+    manifest = read_json(MANIFEST_PATH) or {}
+    graph = import_graph(manifest)
+    if not incremental:
+        manifest = {"imports": graph}
+    hanzipy = SharedHanzipy()
+    workers = default_workers() if workers is None else workers
+    radicals_path = output_path("radicals", levels)
+    hanzi_path = output_path("hanzi", levels)
+    vocab_path = output_path("vocabulary", levels)
 
-def main() -> None:
     # Radicals feed hanzi levels, which feed vocabulary levels.
-    build_radicals_csv()
-    build_hanzi_csv()
-    build_vocabulary_csv()
+    radicals: Optional[Rows] = None
+    inputs = manifest_inputs("radicals", levels, graph)
+    if not (incremental and is_up_to_date(manifest, "radicals", inputs, radicals_path)):
+        with PROFILER.stage("stage.radicals", dump=True):
+            radicals = build_radicals_csv(
+                decomposer=hanzipy.decomposer,
+                write=write,
+                levels=levels,
+                workers=workers,
+                strokes=hanzipy.strokes,
+            )
+        if write:
+            record_table("radicals", levels)
+        manifest["radicals"] = {"inputs": inputs, "output": file_digest(radicals_path)}
+    else:
+        PROFILER.count("manifest.skipped_stages")
+
+    hanzi: Optional[Rows] = None
+    inputs = manifest_inputs("hanzi", levels, graph)
+    if not (incremental and is_up_to_date(manifest, "hanzi", inputs, hanzi_path)):
+        with PROFILER.stage("stage.hanzi", dump=True):
+            hanzi = build_hanzi_csv(
+                radical_levels=tian_levels(radicals, "radical") if radicals is not None else None,
+                decomposer=hanzipy.decomposer,
+                dictionary=hanzipy.dictionary,
+                write=write,
+                levels=levels,
+                workers=workers,
+                vectorized=vectorized,
+                strokes=hanzipy.strokes,
+            )
+        if write:
+            record_table("hanzi", levels)
+        manifest["hanzi"] = {"inputs": inputs, "output": file_digest(hanzi_path)}
+    else:
+        PROFILER.count("manifest.skipped_stages")
+
+    vocabulary: Optional[Rows] = None
+    inputs = manifest_inputs("vocabulary", levels, graph)
+    if not (incremental and is_up_to_date(manifest, "vocabulary", inputs, vocab_path)):
+        with PROFILER.stage("stage.vocabulary", dump=True):
+            vocabulary = build_vocabulary_csv(
+                hanzi_levels=tian_levels(hanzi, "hanzi") if hanzi is not None else None,
+                write=write,
+                levels=levels,
+                workers=workers,
+                vectorized=vectorized,
+            )
+        if write:
+            record_table("vocabulary", levels)
+        manifest["vocabulary"] = {"inputs": inputs, "output": file_digest(vocab_path)}
+    else:
+        PROFILER.count("manifest.skipped_stages")
+
+    if write:
+        write_json(manifest, MANIFEST_PATH)
+    return {"radicals": radicals, "hanzi": hanzi, "vocabulary": vocabulary}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the TIAN radical, hanzi and vocabulary CSVs.")
+    parser.add_argument("--no-csv", action="store_true", help="Run all stages without writing CSVs.")
+    parser.add_argument("--force", action="store_true", help="Rebuild every stage even if its inputs are unchanged.")
+    parser.add_argument("--levels", type=parse_levels, default=LEVELS, help="HSK levels to build, e.g. 1-3 or 1-9.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for per-level work (default: CPU count).")
+    parser.add_argument("--profile", action="store_true", help="Write a JSON timing/counter report (also TIAN_PROFILE=1).")
+    parser.add_argument("--cprofile", action="store_true", help="With profiling, also dump a cProfile file per stage.")
+    parser.add_argument("--vectorized", action="store_true", help="Use the pandas path for levels, sorting and CSV writing.")
+    parser.add_argument("--watch", action="store_true", help="Keep running and rebuild affected rows when inputs change.")
+    parser.add_argument("--interval", type=float, default=0.5, help="Seconds between input polls in --watch mode.")
+    args = parser.parse_args()
+    profiler = configure(args.profile or args.cprofile, args.cprofile)
+    if args.watch:
+        from watch_build import watch
+
+        watch(args.levels, args.interval)
+        return
+    run_pipeline(
+        write=not args.no_csv,
+        force=args.force,
+        levels=args.levels,
+        workers=args.workers,
+        vectorized=args.vectorized or None,
+    )
+    if profiler.enabled:
+        print(f"Profile report written to {profiler.write_report()}")
 
 
 if __name__ == "__main__":
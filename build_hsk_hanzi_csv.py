@@ -1,16 +1,50 @@
 from __future__ import annotations
 
 import importlib
-from typing import Dict, List
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
 
+from component_graph import load_component_graph
+from hanzipy_cache import CachedDecomposer, CachedDictionary, dictionary_pinyins
 from hsk_csv_utils import (
+    PARALLEL_MIN_MISSES,
     HANZI_DIR,
     LEVELS,
-    OUTPUT_DIR,
-    numbered_pinyin_to_tone_marks,
-    read_entries,
+    MNEMONIC_COLUMNS,
+    default_workers,
+    load_mnemonics,
+    map_levels,
+    numbered_pinyin_to_tone_marks_bulk,
+    output_path,
+    read_level_entries,
     write_csv,
 )
+from lexicon_records import HanziRecord
+from row_changelog import record_table
+from stroke_counts import StrokeTable, stroke_sort_key
+from vectorized_build import build_frame, vectorized_enabled, write_frame
+
+if TYPE_CHECKING:  # pragma: no cover
+    from pandas import DataFrame
+
+# (hanzi, raw dictionary pinyins, components) for one list entry.
+HanziEntry = Tuple[str, List[str], List[str]]
+
+HANZI_HEADERS = [
+    "hanzi",
+    "tian_level",
+    "hsk_level",
+    "pinyin",
+    "primary_reading",
+    "simple_meaning",
+    "meaning",
+    "meaning_mnemonic",
+    "reading_mnemonic",
+    "components",
+    "in_names",
+    "stroke_count",
+]
+
 
 def load_hanzipy():
     """Load hanzipy classes without requiring static imports."""
@@ -40,24 +74,9 @@ def unique_preserve_order(values: List[str]) -> List[str]:
 
 
 def lookup_pinyins(hanzi: str, dictionary) -> List[str]:
-    entries = dictionary.definition_lookup(hanzi) or []
-    filtered: List[str] = []
-
-    for entry in entries:
-        if not isinstance(entry, dict):
-            continue
-        definition = str(entry.get("definition") or "")
-        if "(archaic)" in definition.lower():
-            continue
-        pinyin = str(entry.get("pinyin") or "").strip()
-        if pinyin:
-            filtered.append(pinyin)
-
-    if filtered:
-        return filtered
-
-    # Fallback: if CC-CEDICT has no entry, use get_pinyin.
-    return dictionary.get_pinyin(hanzi) or []
+    if isinstance(dictionary, CachedDictionary):
+        return dictionary.pinyins(hanzi)
+    return dictionary_pinyins(hanzi, dictionary)
 
 
 def col_pinyin(raw_pinyins: List[str]) -> str:
@@ -65,7 +84,7 @@ def col_pinyin(raw_pinyins: List[str]) -> str:
         return ""
 
     non_name = [p for p in raw_pinyins if not is_name_pinyin(p)]
-    converted = [numbered_pinyin_to_tone_marks(p) for p in non_name]
+    converted = numbered_pinyin_to_tone_marks_bulk(non_name)
     unique = unique_preserve_order([p for p in converted if p])
     return ";".join(unique)
 
@@ -89,9 +108,9 @@ def get_components(hanzi: str, decomposer) -> List[str]:
     return list(dict.fromkeys(cleaned))
 
 
-def load_radical_levels() -> Dict[str, int]:
-    path = OUTPUT_DIR / "radicals_levels_1_3.csv"
+def load_radical_levels(path: Optional[Path] = None) -> Dict[str, int]:
     levels: Dict[str, int] = {}
+    path = path or output_path("radicals")
     if not path.exists():
         return levels
     import csv
@@ -116,61 +135,174 @@ def tian_level_from_components(components: List[str], radical_levels: Dict[str,
     return max(levels) if levels else fallback
 
 
-def build_hanzi_csv() -> None:
-    HanziDecomposer, HanziDictionary = load_hanzipy()
-    dictionary = HanziDictionary()
-    decomposer = HanziDecomposer()
-    radical_levels = load_radical_levels()
-
-    rows: List[Dict[str, object]] = []
-    for level in LEVELS:
-        source = HANZI_DIR / f"HSK_Level_{level}_hanzi.txt"
-        entries = read_entries(source)
-        for hanzi in entries:
-            raw_pinyins = lookup_pinyins(hanzi, dictionary)
-            pinyin_str = col_pinyin(raw_pinyins)
-            primary_reading = pinyin_str.split(";")[0] if pinyin_str else ""
-            components_list = get_components(hanzi, decomposer)
-            tian_level = tian_level_from_components(components_list, radical_levels, level)
-            rows.append(
-                {
-                    "hanzi": col_hanzi(hanzi),
-                    "tian_level": tian_level,
-                    "hsk_level": level,
-                    "pinyin": pinyin_str,
-                    "primary_reading": primary_reading,
-                    "simple_meaning": "",
-                    "meaning": "",
-                    "meaning_mnemonic": "",
-                    "reading_mnemonic": "",
-                    "components": " ".join(components_list),
-                    "in_names": col_in_names(raw_pinyins),
-                }
-            )
+def level_entries(level: int, decomposer, dictionary) -> List[HanziEntry]:
+    """Look up pinyin and components for every entry of one HSK level's list."""
+    source = HANZI_DIR / f"HSK_Level_{level}_hanzi.txt"
+    return [
+        (hanzi, lookup_pinyins(hanzi, dictionary), get_components(hanzi, decomposer))
+        for hanzi in read_level_entries(source)
+    ]
+
+
+def hanzi_row(
+    entry: HanziEntry,
+    level: int,
+    component_levels: Dict[str, int],
+    stroke_counts: Dict[str, Optional[int]],
+    mnemonics: Dict[str, Dict[str, str]],
+) -> HanziRecord:
+    hanzi, raw_pinyins, components_list = entry
+    pinyin_str = col_pinyin(raw_pinyins)
+    primary_reading = pinyin_str.split(";")[0] if pinyin_str else ""
+    return HanziRecord(
+        hanzi=col_hanzi(hanzi),
+        tian_level=tian_level_from_components(components_list, component_levels, level),
+        hsk_level=level,
+        pinyin=pinyin_str,
+        primary_reading=primary_reading,
+        components=" ".join(components_list),
+        in_names=col_in_names(raw_pinyins),
+        stroke_count=stroke_counts.get(hanzi),
+        **mnemonics.get(hanzi, {}),
+    )
+
+
+def hanzi_sort_key(row: HanziRecord) -> Tuple[int, int, Tuple[bool, int], str]:
+    """Within a tian_level and HSK level, simpler characters come first."""
+    return row.tian_level, row.hsk_level, stroke_sort_key(row.stroke_count), row.hanzi
+
+
+def create_dictionary() -> CachedDictionary:
+    """Return a dictionary that only loads hanzipy on a cache miss."""
+    return CachedDictionary(lambda: load_hanzipy()[1]())
+
+
+def lookup_level(level: int) -> Tuple[List[HanziEntry], Dict, Dict]:
+    """Worker: process one level with process-local cached hanzipy objects."""
+    decomposer = CachedDecomposer(lambda: load_hanzipy()[0]())
+    dictionary = create_dictionary()
+    entries = level_entries(level, decomposer, dictionary)
+    return entries, decomposer.new_entries(), dictionary.new_entries()
+
+
+def build_hanzi_csv(
+    radical_levels: Optional[Dict[str, int]] = None,
+    decomposer=None,
+    dictionary=None,
+    write: bool = True,
+    levels: List[int] = LEVELS,
+    workers: Optional[int] = None,
+    vectorized: Optional[bool] = None,
+    strokes: Optional[StrokeTable] = None,
+) -> Union[List[HanziRecord], DataFrame]:
+    """Build the hanzi table.
+
+    Stages run by the orchestrator hand in ``radical_levels`` and shared
+    hanzipy objects; standalone runs load them here. Pass ``write=False`` to
+    skip the CSV sink. With cached hanzipy objects, more than one worker and
+    enough cache misses to repay the pool, levels are processed in a worker
+    pool and new cache entries are merged back; otherwise the whole
+    character set is looked up in one batch.
+    ``vectorized`` (default: TIAN_VECTORIZED) returns a pandas DataFrame
+    instead of records.
+    """
+    workers = default_workers() if workers is None else workers
+    if decomposer is None:
+        decomposer = CachedDecomposer(lambda: load_hanzipy()[0]())
+    if dictionary is None:
+        dictionary = create_dictionary()
+    characters = [hanzi for level in levels for hanzi in read_level_entries(HANZI_DIR / f"HSK_Level_{level}_hanzi.txt")]
+    parallel = (
+        workers > 1
+        and len(levels) > 1
+        and isinstance(dictionary, CachedDictionary)
+        and isinstance(decomposer, CachedDecomposer)
+        and max(decomposer.misses(characters, 2), dictionary.misses(characters)) >= PARALLEL_MIN_MISSES
+    )
+    if radical_levels is None:
+        radical_levels = load_radical_levels(output_path("radicals", levels))
+
+    if parallel:
+        results = map_levels(lookup_level, levels, workers)
+        for _, new_decompositions, new_pinyins in results:
+            decomposer.merge(new_decompositions)
+            dictionary.merge(new_pinyins)
+        per_level = [entries for entries, _, _ in results]
+    else:
+        if isinstance(dictionary, CachedDictionary):
+            dictionary.lookup_many(characters)
+        per_level = [level_entries(level, decomposer, dictionary) for level in levels]
+
+    # Components missing from the radical table take the highest level found
+    # among their own parts, resolved once over the component graph.
+    graph = load_component_graph(
+        (c for entries in per_level for _, _, components in entries for c in components), decomposer, radical_levels
+    )
+    component_levels = graph.resolve_levels(radical_levels)
+    strokes = StrokeTable() if strokes is None else strokes
+    stroke_counts = strokes.counts(hanzi for entries in per_level for hanzi, _, _ in entries)
+    strokes.save()
+
+    if isinstance(decomposer, CachedDecomposer):
+        decomposer.save()
+    if isinstance(dictionary, CachedDictionary):
+        dictionary.save()
+
+    mnemonics = load_mnemonics("hanzi")
+    if vectorized_enabled() if vectorized is None else vectorized:
+        return build_hanzi_frame(per_level, levels, component_levels, stroke_counts, mnemonics, write)
+
+    rows = [
+        hanzi_row(entry, level, component_levels, stroke_counts, mnemonics)
+        for level, entries in zip(levels, per_level)
+        for entry in entries
+    ]
 
     # Confirming existing sort operation
-    rows.sort(key=lambda r: (r["tian_level"], r["hsk_level"], r["hanzi"]))
-    write_csv(
-        rows,
-        [
-            "hanzi",
-            "tian_level",
-            "hsk_level",
-            "pinyin",
-            "primary_reading",
-            "simple_meaning",
-            "meaning",
-            "meaning_mnemonic",
-            "reading_mnemonic",
-            "components",
-            "in_names",
-        ],
-        OUTPUT_DIR / "hanzi_levels_1_3.csv",
+    rows.sort(key=hanzi_sort_key)
+    if write:
+        write_csv(rows, HANZI_HEADERS, output_path("hanzi", levels))
+    return rows
+
+
+def build_hanzi_frame(
+    per_level: List[List[HanziEntry]],
+    levels: List[int],
+    component_levels: Dict[str, int],
+    stroke_counts: Dict[str, Optional[int]],
+    mnemonics: Dict[str, Dict[str, str]],
+    write: bool = True,
+) -> DataFrame:
+    """Vectorized tail of build_hanzi_csv: returns a sorted DataFrame."""
+    entries = [entry for chunk in per_level for entry in chunk]
+    pinyins = [col_pinyin(raw_pinyins) for _, raw_pinyins, _ in entries]
+    frame = build_frame(
+        {
+            "hanzi": [col_hanzi(hanzi) for hanzi, _, _ in entries],
+            "hsk_level": [level for level, chunk in zip(levels, per_level) for _ in chunk],
+            "pinyin": pinyins,
+            "primary_reading": [p.split(";")[0] if p else "" for p in pinyins],
+            "components": [" ".join(components) for _, _, components in entries],
+            "in_names": [col_in_names(raw_pinyins) for _, raw_pinyins, _ in entries],
+            "stroke_count": [stroke_counts.get(hanzi) for hanzi, _, _ in entries],
+            **{
+                column: [mnemonics.get(hanzi, {}).get(column, "") for hanzi, _, _ in entries]
+                for column in MNEMONIC_COLUMNS
+            },
+        },
+        [components for _, _, components in entries],
+        component_levels,
+        HANZI_HEADERS,
+        ["tian_level", "hsk_level", "stroke_count", "hanzi"],
     )
+    if write:
+        write_frame(frame, output_path("hanzi", levels))
+    return frame
 
 
 def main() -> None:
     build_hanzi_csv()
+    record_table("hanzi", LEVELS)
 
 
 if __name__ == "__main__":
@@ -2,20 +2,52 @@ from __future__ import annotations
 
 import csv
 import re
+from concurrent.futures import ProcessPoolExecutor
 from html import unescape
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
 from pathlib import Path
 
+from build_profile import PROFILER
 from hsk_csv_utils import (
+    HANZI_CSV_PATH,
     LEVELS,
-    OUTPUT_DIR,
+    MNEMONIC_COLUMNS,
     WORDS_DIR,
-    read_entries,
+    default_workers,
+    load_mnemonics,
+    output_path,
+    read_level_entries,
     write_csv,
 )
+from lexicon_records import AnkiEntry, VocabRecord
+from row_changelog import record_table
+from vectorized_build import build_frame, vectorized_enabled, write_frame
+
+if TYPE_CHECKING:  # pragma: no cover
+    from pandas import DataFrame
 
 ANKI_DIR = WORDS_DIR.parent / "Anki xiehanzi"
-HANZI_LEVELS_PATH = OUTPUT_DIR / "hanzi_levels_1_3.csv"
+HANZI_LEVELS_PATH = HANZI_CSV_PATH
+VOCAB_HEADERS = [
+    "vocab",
+    "tian_level",
+    "hsk_level",
+    "pinyin",
+    "pinyin_spaced",
+    "meaning",
+    "simple_meaning",
+    "meaning_mnemonic",
+    "reading_mnemonic",
+    "components",
+    "example_sentences",
+]
+
+TAG_RE = re.compile(r"<[^>]+>")
+PINYIN_RE = re.compile(r'<span class="pinYinWrapper">(.*?)</span>\s*<ul', re.S)
+LI_RE = re.compile(r"<li>(.*?)</li>", re.S)
+
+# Anki files larger than this in total are parsed in a process pool.
+PARALLEL_MIN_BYTES = 1 << 20
 
 
 def unique_preserve_order(values: List[str]) -> List[str]:
@@ -23,21 +55,31 @@ def unique_preserve_order(values: List[str]) -> List[str]:
 
 
 def strip_tags(text: str) -> str:
-    return re.sub(r"<[^>]+>", " ", text)
+    return TAG_RE.sub(" ", text)
 
 
 def parse_pinyin_syllables(html_text: str, fallback: str) -> List[str]:
-    match = re.search(r'<span class="pinYinWrapper">(.*?)</span>\s*<ul', html_text, re.S)
+    match = PINYIN_RE.search(html_text)
     source = match.group(1) if match else fallback
     cleaned = strip_tags(unescape(source))
     return [part.lower() for part in cleaned.split() if part]
 
 
-def parse_meaning(html_text: str) -> str:
-    lis = re.findall(r"<li>(.*?)</li>", html_text, re.S)
-    cleaned = [" ".join(strip_tags(unescape(li)).split()) for li in lis if li]
-    cleaned = [c for c in cleaned if c]
-    return "; ".join(cleaned)
+def parse_anki_html(html_text: str, fallback_pinyin: str) -> Tuple[List[str], str, str]:
+    """Return (pinyin syllables, meaning, simple meaning) from one row's HTML.
+
+    Each <li> is unescaped and cleaned once; the meaning joins all non-empty
+    items and the simple meaning is the first of them.
+    """
+    meanings: List[str] = []
+    for li in LI_RE.findall(html_text):
+        if not li:
+            continue
+        cleaned = " ".join(strip_tags(unescape(li)).split())
+        if cleaned:
+            meanings.append(cleaned)
+    simple_meaning = meanings[0] if meanings else ""
+    return parse_pinyin_syllables(html_text, fallback_pinyin), "; ".join(meanings), simple_meaning
 
 
 def load_hanzi_levels(path: Path = HANZI_LEVELS_PATH) -> Dict[str, int]:
@@ -57,42 +99,53 @@ def load_hanzi_levels(path: Path = HANZI_LEVELS_PATH) -> Dict[str, int]:
     return levels
 
 
-def parse_simple_meaning(html_text: str) -> str:
-    lis = re.findall(r"<li>(.*?)</li>", html_text, re.S)
-    for li in lis:
-        cleaned = " ".join(strip_tags(unescape(li)).split())
-        if cleaned:
-            return cleaned
-    return ""
+def anki_sources(levels: List[int]) -> List[Path]:
+    return [ANKI_DIR / f"HSK_Level_{level}.txt" for level in levels]
 
 
-def load_anki_data(levels: List[int]) -> Dict[str, Dict[str, object]]:
-    data: Dict[str, Dict[str, object]] = {}
-    for level in levels:
-        path = ANKI_DIR / f"HSK_Level_{level}.txt"
-        if not path.exists():
-            continue
-        with path.open(encoding="utf-8") as handle:
-            reader = csv.reader(handle, delimiter="\t")
-            for row in reader:
-                if len(row) < 4:
-                    continue
-                simp = row[0].strip()
-                trad = row[1].strip() if len(row) > 1 else ""
-                base_pinyin = row[2].strip() if len(row) > 2 else ""
-                html_text = "\t".join(row[7:]) if len(row) > 7 else row[-1] if row else ""
-                pinyin_syllables = parse_pinyin_syllables(html_text, base_pinyin)
-                meaning = parse_meaning(html_text)
-                simple_meaning = parse_simple_meaning(html_text)
-                entry = {
-                    "pinyin": pinyin_syllables,
-                    "meaning": meaning,
-                    "simple_meaning": simple_meaning,
-                }
-                if simp:
-                    data[simp] = entry
-                if trad:
-                    data.setdefault(trad, entry)
+def load_anki_file(path: Path) -> List[Tuple[str, str, AnkiEntry]]:
+    """Parse one Anki xiehanzi export into (simplified, traditional, entry) rows."""
+    parsed: List[Tuple[str, str, AnkiEntry]] = []
+    with path.open(encoding="utf-8") as handle:
+        reader = csv.reader(handle, delimiter="\t")
+        for row in reader:
+            if len(row) < 4:
+                continue
+            simp = row[0].strip()
+            trad = row[1].strip() if len(row) > 1 else ""
+            base_pinyin = row[2].strip() if len(row) > 2 else ""
+            html_text = "\t".join(row[7:]) if len(row) > 7 else row[-1] if row else ""
+            parsed.append((simp, trad, AnkiEntry(*parse_anki_html(html_text, base_pinyin))))
+    return parsed
+
+
+def load_anki_data(levels: List[int], workers: Optional[int] = None) -> Dict[str, AnkiEntry]:
+    """Load Anki entries keyed by simplified and traditional forms.
+
+    Level files are independent, so large exports are parsed in a process
+    pool; results are merged in level order so later levels still win.
+    """
+    paths = [path for path in anki_sources(levels) if path.exists()]
+    workers = default_workers() if workers is None else workers
+    total_bytes = sum(path.stat().st_size for path in paths)
+    if workers > 1 and len(paths) > 1 and total_bytes >= PARALLEL_MIN_BYTES:
+        with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+            parsed_files = list(pool.map(load_anki_file, paths))
+    else:
+        parsed_files = [load_anki_file(path) for path in paths]
+
+    return merge_anki_files(parsed_files)
+
+
+def merge_anki_files(parsed_files: List[List[Tuple[str, str, AnkiEntry]]]) -> Dict[str, AnkiEntry]:
+    """Key parsed entries by simplified and traditional form; later files win."""
+    data: Dict[str, AnkiEntry] = {}
+    for parsed in parsed_files:
+        for simp, trad, entry in parsed:
+            if simp:
+                data[simp] = entry
+            if trad:
+                data.setdefault(trad, entry)
     return data
 
 
@@ -104,97 +157,147 @@ def normalize_vocab_key(word: str) -> str:
     return word[:i] if i != len(word) else word
 
 
-def col_pinyin_from_data(word: str, anki_data: Dict[str, Dict[str, object]]) -> str:
+def col_pinyin_from_data(word: str, anki_data: Dict[str, AnkiEntry]) -> str:
     key = normalize_vocab_key(word)
-    entry: Optional[Dict[str, object]] = anki_data.get(key) or anki_data.get(word)
+    entry: Optional[AnkiEntry] = anki_data.get(key) or anki_data.get(word)
     if not entry:
         return ""
-    syllables = entry.get("pinyin", [])
+    syllables = entry.pinyin
     if not isinstance(syllables, list):
         return ""
     unique = unique_preserve_order([s for s in syllables if s])
     return "".join(unique)
 
 
-def col_pinyin_spaced(word: str, anki_data: Dict[str, Dict[str, object]]) -> str:
+def col_pinyin_spaced(word: str, anki_data: Dict[str, AnkiEntry]) -> str:
     key = normalize_vocab_key(word)
-    entry: Optional[Dict[str, object]] = anki_data.get(key) or anki_data.get(word)
+    entry: Optional[AnkiEntry] = anki_data.get(key) or anki_data.get(word)
     if not entry:
         return ""
-    syllables = entry.get("pinyin", [])
+    syllables = entry.pinyin
     if not isinstance(syllables, list):
         return ""
     unique = unique_preserve_order([s for s in syllables if s])
     return " ".join(unique)
 
 
-def col_meaning_from_data(word: str, anki_data: Dict[str, Dict[str, object]]) -> str:
+def col_meaning_from_data(word: str, anki_data: Dict[str, AnkiEntry]) -> str:
     key = normalize_vocab_key(word)
-    entry: Optional[Dict[str, object]] = anki_data.get(key) or anki_data.get(word)
+    entry: Optional[AnkiEntry] = anki_data.get(key) or anki_data.get(word)
     if not entry:
         return ""
-    meaning = entry.get("meaning", "")
+    meaning = entry.meaning
     return meaning if isinstance(meaning, str) else ""
 
 
-def col_simple_meaning_from_data(word: str, anki_data: Dict[str, Dict[str, object]]) -> str:
+def col_simple_meaning_from_data(word: str, anki_data: Dict[str, AnkiEntry]) -> str:
     key = normalize_vocab_key(word)
-    entry: Optional[Dict[str, object]] = anki_data.get(key) or anki_data.get(word)
+    entry: Optional[AnkiEntry] = anki_data.get(key) or anki_data.get(word)
     if not entry:
         return ""
-    meaning = entry.get("simple_meaning", "")
+    meaning = entry.simple_meaning
     return meaning if isinstance(meaning, str) else ""
 
 
-def build_vocabulary_csv() -> None:
-    anki_data = load_anki_data(LEVELS)
-    hanzi_levels = load_hanzi_levels()
+def tian_level_from_chars(word: str, hanzi_levels: Dict[str, int], fallback: int) -> int:
+    """A word's level is the highest level among its known characters."""
+    char_levels = [hanzi_levels[ch] for ch in word if ch in hanzi_levels]
+    return max(char_levels) if char_levels else fallback
+
+
+def vocab_row(
+    vocab: str,
+    level: int,
+    anki_data: Dict[str, AnkiEntry],
+    hanzi_levels: Dict[str, int],
+    mnemonics: Dict[str, Dict[str, str]],
+) -> VocabRecord:
+    return VocabRecord(
+        vocab=vocab,
+        tian_level=tian_level_from_chars(vocab, hanzi_levels, level),
+        hsk_level=level,
+        pinyin=col_pinyin_from_data(vocab, anki_data),
+        pinyin_spaced=col_pinyin_spaced(vocab, anki_data),
+        meaning=col_meaning_from_data(vocab, anki_data),
+        simple_meaning=col_simple_meaning_from_data(vocab, anki_data),
+        **mnemonics.get(vocab, {}),
+    )
+
+
+def vocab_sort_key(row: VocabRecord) -> Tuple[int, int, str]:
+    return row.tian_level, row.hsk_level, row.vocab
+
 
-    rows: List[Dict[str, object]] = []
-    for level in LEVELS:
+def build_vocabulary_csv(
+    hanzi_levels: Optional[Dict[str, int]] = None,
+    write: bool = True,
+    levels: List[int] = LEVELS,
+    workers: Optional[int] = None,
+    vectorized: Optional[bool] = None,
+) -> Union[List[VocabRecord], DataFrame]:
+    """Build the vocabulary table; pass ``write=False`` to skip the CSV sink.
+
+    Returns the sorted rows as VocabRecords or, when ``vectorized`` (default:
+    TIAN_VECTORIZED) is set, as a pandas DataFrame with the same columns.
+    """
+    with PROFILER.stage("vocabulary.anki_parse"):
+        anki_data = load_anki_data(levels, workers)
+    if hanzi_levels is None:
+        hanzi_levels = load_hanzi_levels(output_path("hanzi", levels))
+
+    mnemonics = load_mnemonics("vocabulary")
+    if vectorized_enabled() if vectorized is None else vectorized:
+        return build_vocabulary_frame(anki_data, hanzi_levels, levels, mnemonics, write)
+
+    rows: List[VocabRecord] = []
+    for level in levels:
         source = WORDS_DIR / f"HSK_Level_{level}_words.txt"
-        entries = read_entries(source)
-        for vocab in entries:
-            char_levels = [hanzi_levels.get(ch) for ch in vocab if hanzi_levels.get(ch) is not None]
-            tian_level = max(char_levels) if char_levels else level
-            rows.append(
-                {
-                    "vocab": vocab,
-                    "tian_level": tian_level,
-                    "hsk_level": level,
-                    "pinyin": col_pinyin_from_data(vocab, anki_data),
-                    "pinyin_spaced": col_pinyin_spaced(vocab, anki_data),
-                    "meaning": col_meaning_from_data(vocab, anki_data),
-                    "simple_meaning": col_simple_meaning_from_data(vocab, anki_data),
-                    "meaning_mnemonic": "",
-                    "reading_mnemonic": "",
-                    "components": "",
-                    "example_sentences": "",
-                }
-            )
-
-    rows.sort(key=lambda r: (r["tian_level"], r["hsk_level"], r["vocab"]))
-    write_csv(
-        rows,
-        [
-            "vocab",
-            "tian_level",
-            "hsk_level",
-            "pinyin",
-            "pinyin_spaced",
-            "meaning",
-            "simple_meaning",
-            "meaning_mnemonic",
-            "reading_mnemonic",
-            "components",
-            "example_sentences",
-        ],
-        OUTPUT_DIR / "vocabulary_levels_1_3.csv",
+        entries = read_level_entries(source)
+        rows.extend(vocab_row(vocab, level, anki_data, hanzi_levels, mnemonics) for vocab in entries)
+
+    rows.sort(key=vocab_sort_key)
+    if write:
+        write_csv(rows, VOCAB_HEADERS, output_path("vocabulary", levels))
+    return rows
+
+
+def build_vocabulary_frame(
+    anki_data: Dict[str, AnkiEntry],
+    hanzi_levels: Dict[str, int],
+    levels: List[int],
+    mnemonics: Dict[str, Dict[str, str]],
+    write: bool = True,
+) -> DataFrame:
+    """Vectorized variant of build_vocabulary_csv: returns a sorted DataFrame."""
+    words: List[str] = []
+    hsk_levels: List[int] = []
+    for level in levels:
+        entries = read_level_entries(WORDS_DIR / f"HSK_Level_{level}_words.txt")
+        words.extend(entries)
+        hsk_levels.extend([level] * len(entries))
+    frame = build_frame(
+        {
+            "vocab": words,
+            "hsk_level": hsk_levels,
+            "pinyin": [col_pinyin_from_data(vocab, anki_data) for vocab in words],
+            "pinyin_spaced": [col_pinyin_spaced(vocab, anki_data) for vocab in words],
+            "meaning": [col_meaning_from_data(vocab, anki_data) for vocab in words],
+            "simple_meaning": [col_simple_meaning_from_data(vocab, anki_data) for vocab in words],
+            **{column: [mnemonics.get(vocab, {}).get(column, "") for vocab in words] for column in MNEMONIC_COLUMNS},
+        },
+        [list(vocab) for vocab in words],
+        hanzi_levels,
+        VOCAB_HEADERS,
+        ["tian_level", "hsk_level", "vocab"],
     )
+    if write:
+        write_frame(frame, output_path("vocabulary", levels))
+    return frame
 
 
 def main() -> None:
     build_vocabulary_csv()
+    record_table("vocabulary", LEVELS)
 
 
 if __name__ == "__main__":
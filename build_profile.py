@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+"""
+Opt-in instrumentation for the CSV build.
+
+Enable with ``build_hsk_csv.py --profile`` or ``TIAN_PROFILE=1``; set
+``TIAN_PROFILE=cprofile`` (or pass ``--cprofile``) to also dump a cProfile
+file per stage. When disabled, every hook is a cheap no-op.
+"""
+
+import contextlib
+import cProfile
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+PROFILE_ENV = "TIAN_PROFILE"
+PROFILE_DIR = Path(__file__).resolve().parent / ".cache" / "profile"
+
+
+class BuildProfiler:
+    """Collects per-stage wall times, call counters and cache hit/miss counts."""
+
+    def __init__(self, enabled: bool = False, cprofile: bool = False, output_dir: Path = PROFILE_DIR) -> None:
+        self.enabled = enabled
+        self.cprofile = cprofile
+        self.output_dir = output_dir
+        self.timings: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self.counters: Dict[str, int] = {}
+
+    @contextlib.contextmanager
+    def stage(self, name: str, dump: bool = False) -> Iterator[None]:
+        """Time a block; repeated stages accumulate.
+
+        ``dump`` marks top-level stages that get their own cProfile file when
+        cProfile output is on; nested blocks are only timed.
+        """
+        if not self.enabled:
+            yield
+            return
+        profile = cProfile.Profile() if self.cprofile and dump else None
+        start = time.perf_counter()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                self.output_dir.mkdir(parents=True, exist_ok=True)
+                profile.dump_stats(str(self.output_dir / f"{name}.prof"))
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def count(self, name: str, n: int = 1) -> None:
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def hit(self, cache: str, hit: bool) -> None:
+        if self.enabled:
+            self.count(f"{cache}.{'hit' if hit else 'miss'}")
+
+    def report(self) -> Dict[str, object]:
+        caches: Dict[str, Dict[str, float]] = {}
+        for name, value in self.counters.items():
+            cache, _, kind = name.rpartition(".")
+            if kind in ("hit", "miss"):
+                caches.setdefault(cache, {"hit": 0, "miss": 0})[kind] = value
+        for stats in caches.values():
+            total = stats["hit"] + stats["miss"]
+            stats["hit_rate"] = round(stats["hit"] / total, 4) if total else 0.0
+
+        from hsk_csv_utils import convert_syllable_cached
+
+        info = convert_syllable_cached.cache_info()
+        caches["pinyin_fallback"] = {
+            "hit": info.hits,
+            "miss": info.misses,
+            "hit_rate": round(info.hits / (info.hits + info.misses), 4) if info.hits + info.misses else 0.0,
+        }
+        return {
+            "stages": {
+                name: {"seconds": round(seconds, 6), "calls": self.calls[name]}
+                for name, seconds in self.timings.items()
+            },
+            "counters": {k: v for k, v in self.counters.items() if k.rpartition(".")[2] not in ("hit", "miss")},
+            "caches": caches,
+        }
+
+    def write_report(self, path: Optional[Path] = None) -> Path:
+        path = path or self.output_dir / "report.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.report(), indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        return path
+
+
+def profiler_from_env() -> BuildProfiler:
+    mode = os.environ.get(PROFILE_ENV, "").strip().lower()
+    return BuildProfiler(enabled=mode not in ("", "0", "false"), cprofile=mode == "cprofile")
+
+
+PROFILER = profiler_from_env()
+
+
+def configure(enabled: bool, cprofile: bool = False) -> BuildProfiler:
+    """Switch the shared profiler on or off (e.g. from a --profile flag)."""
+    PROFILER.enabled = enabled or PROFILER.enabled
+    PROFILER.cprofile = cprofile or PROFILER.cprofile
+    return PROFILER
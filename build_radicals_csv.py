@@ -2,10 +2,46 @@ from __future__ import annotations
 
 import importlib
 import math
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
-from hsk_csv_utils import HANZI_DIR, LEVELS, OUTPUT_DIR, read_entries, write_csv
+from hanzipy_cache import CachedDecomposer
+from lexicon_records import RadicalRecord
+from row_changelog import record_table
+from stroke_counts import StrokeTable, stroke_sort_key
+from hsk_csv_utils import (
+    PARALLEL_MIN_MISSES,
+    HANZI_DIR,
+    LEVELS,
+    default_workers,
+    map_levels,
+    output_path,
+    read_level_entries,
+    write_csv,
+)
 
+# Productivity weight per HSK level; levels not listed count once.
+LEVEL_WEIGHTS: Dict[int, int] = {1: 5, 2: 3, 3: 1}
+# Hanzi unlocked per raw level before raw levels are scaled onto 1..MAX_TIAN_LEVEL.
+TARGET_PER_LEVEL = 15
+MAX_TIAN_LEVEL = 60
+
+
+def level_weight(level: int, weights: Dict[int, int] = LEVEL_WEIGHTS) -> int:
+    return weights.get(level, 1)
+
+
+def radicals_headers(levels: List[int] = LEVELS) -> List[str]:
+    return [
+        "radical",
+        "tian_level",
+        "radical_name",
+        *[f"hsk{level}_occurance" for level in levels],
+        "productivity score",
+        "stroke_count",
+    ]
+
+
+RADICALS_HEADERS = radicals_headers()
 
 def load_decomposer():
     try:
@@ -20,6 +56,11 @@ def load_decomposer():
         )
 
 
+def create_decomposer() -> CachedDecomposer:
+    """Return a decomposer that only loads hanzipy on a cache miss."""
+    return CachedDecomposer(lambda: load_decomposer()())
+
+
 def extract_radicals(hanzi: str, decomposer) -> List[str]:
     decomposition = decomposer.decompose(hanzi, 2)
     if not isinstance(decomposition, dict):
@@ -31,105 +72,189 @@ def extract_radicals(hanzi: str, decomposer) -> List[str]:
     return list(dict.fromkeys(cleaned))
 
 
-def load_hanzi_components(decomposer) -> Dict[str, List[str]]:
+def level_hanzi(levels: List[int]) -> List[str]:
+    """Every entry of the given levels' hanzi lists, in order."""
+    return [hanzi for level in levels for hanzi in read_level_entries(HANZI_DIR / f"HSK_Level_{level}_hanzi.txt")]
+
+
+def level_components(level: int, decomposer) -> List[Tuple[str, List[str]]]:
+    """Return (hanzi, components) for every entry of one HSK level's list."""
+    source = HANZI_DIR / f"HSK_Level_{level}_hanzi.txt"
+    return [(hanzi, extract_radicals(hanzi, decomposer)) for hanzi in read_level_entries(source)]
+
+
+def decompose_level(level: int) -> Tuple[List[Tuple[str, List[str]]], Dict]:
+    """Worker: decompose one level with a process-local cached decomposer."""
+    decomposer = create_decomposer()
+    return level_components(level, decomposer), decomposer.new_entries()
+
+
+def collect_level_components(
+    decomposer, levels: List[int] = LEVELS, workers: Optional[int] = None
+) -> List[List[Tuple[str, List[str]]]]:
+    """Decompose each level's hanzi, one level per worker process when possible.
+
+    Workers build their own decomposer from the on-disk cache and hand new
+    cache entries back, so only a CachedDecomposer can be fanned out, and
+    only when enough characters miss the cache to repay starting the pool.
+    """
+    workers = default_workers() if workers is None else workers
+    if (
+        workers > 1
+        and len(levels) > 1
+        and isinstance(decomposer, CachedDecomposer)
+        and decomposer.misses(level_hanzi(levels), 2) >= PARALLEL_MIN_MISSES
+    ):
+        results = map_levels(decompose_level, levels, workers)
+        for _, entries in results:
+            decomposer.merge(entries)
+        return [components for components, _ in results]
+    return [level_components(level, decomposer) for level in levels]
+
+
+def hanzi_components_from_levels(per_level: List[List[Tuple[str, List[str]]]]) -> Dict[str, List[str]]:
     mapping: Dict[str, List[str]] = {}
-    for level in LEVELS:
-        source = HANZI_DIR / f"HSK_Level_{level}_hanzi.txt"
-        if not source.exists():
-            continue
-        for hanzi in read_entries(source):
-            comps = extract_radicals(hanzi, decomposer)
+    for entries in per_level:
+        for hanzi, comps in entries:
             if comps:
                 mapping[hanzi] = comps
     return mapping
 
 
-def build_radicals_csv() -> None:
-    HanziDecomposer = load_decomposer()
-    decomposer = HanziDecomposer()
+def load_hanzi_components(
+    decomposer, levels: List[int] = LEVELS, workers: Optional[int] = None
+) -> Dict[str, List[str]]:
+    return hanzi_components_from_levels(collect_level_components(decomposer, levels, workers))
 
-    hanzi_components = load_hanzi_components(decomposer)
 
-    counts: Dict[str, Dict[str, int]] = {}
+def assign_raw_levels(
+    radical_order: List[str],
+    hanzi_components: Dict[str, List[str]],
+    target_per_level: int,
+) -> Dict[str, int]:
+    """Map each radical to the raw level implied by the hanzi it unlocks.
 
-    for level in LEVELS:
-        source = HANZI_DIR / f"HSK_Level_{level}_hanzi.txt"
-        entries = read_entries(source)
-        for hanzi in entries:
-            for radical in extract_radicals(hanzi, decomposer):
-                record = counts.setdefault(radical, {"hsk1": 0, "hsk2": 0, "hsk3": 0})
-                record[f"hsk{level}"] += 1
+    A hanzi unlocks once every one of its components has been introduced.
+    Keeping a radical -> hanzi inverted index and a per-hanzi count of missing
+    components makes this linear in the total number of components.
+    """
+    users: Dict[str, List[str]] = {}
+    missing: Dict[str, int] = {}
+    for hanzi, comps in hanzi_components.items():
+        unique = set(comps)
+        missing[hanzi] = len(unique)
+        for comp in unique:
+            users.setdefault(comp, []).append(hanzi)
 
-    radicals_sorted = sorted(
-        counts.items(),
-        key=lambda kv: (
-            -(kv[1]["hsk1"] * 5 + kv[1]["hsk2"] * 3 + kv[1]["hsk3"]),
-            kv[0],
-        ),
-    )
-
-    introduced: set[str] = set()
-    unlocked_hanzi: set[str] = set()
+    unlocked = 0
     raw_level_map: Dict[str, int] = {}
-    target_per_level = 15
-
-    for radical, record in radicals_sorted:
-        introduced.add(radical)
-        for hanzi, comps in hanzi_components.items():
-            if hanzi in unlocked_hanzi:
-                continue
-            if set(comps).issubset(introduced):
-                unlocked_hanzi.add(hanzi)
-        raw_level = (len(unlocked_hanzi) + target_per_level - 1) // target_per_level
+    for radical in radical_order:
+        for hanzi in users.pop(radical, ()):
+            missing[hanzi] -= 1
+            if missing[hanzi] == 0:
+                unlocked += 1
+        raw_level = (unlocked + target_per_level - 1) // target_per_level
         raw_level_map[radical] = max(1, raw_level)
+    return raw_level_map
+
+
+def assign_tian_levels(
+    per_level: List[List[Tuple[str, List[str]]]],
+    levels: List[int] = LEVELS,
+    target_per_level: int = TARGET_PER_LEVEL,
+    weights: Dict[int, int] = LEVEL_WEIGHTS,
+    max_level: int = MAX_TIAN_LEVEL,
+) -> Tuple[List[Tuple[str, Dict[int, int]]], Dict[str, int], Dict[str, int]]:
+    """Level the radicals found in ``per_level`` (one list per HSK level).
+
+    Returns (radical, per-level counts) sorted by productivity, each radical's
+    productivity, and each radical's tian_level. Radicals are introduced in
+    productivity order; raw levels follow the hanzi they unlock and are then
+    scaled onto 1..``max_level``.
+    """
+    hanzi_components = hanzi_components_from_levels(per_level)
+    counts: Dict[str, Dict[int, int]] = {}
+    for level, entries in zip(levels, per_level):
+        for hanzi, comps in entries:
+            for radical in comps:
+                record = counts.setdefault(radical, dict.fromkeys(levels, 0))
+                record[level] += 1
+
+    productivity = {
+        radical: sum(level_weight(level, weights) * count for level, count in record.items())
+        for radical, record in counts.items()
+    }
+    radicals_sorted = sorted(counts.items(), key=lambda kv: (-productivity[kv[0]], kv[0]))
 
+    raw_level_map = assign_raw_levels(
+        [radical for radical, _ in radicals_sorted], hanzi_components, target_per_level
+    )
     max_raw_level = max(raw_level_map.values()) if raw_level_map else 1
 
-    rows: List[Dict[str, object]] = []
-    for radical, record in radicals_sorted:
-        h1 = record["hsk1"]
-        h2 = record["hsk2"]
-        h3 = record["hsk3"]
-        productivity = h1 * 5 + h2 * 3 + h3
-        radical_name = decomposer.get_radical_meaning(radical) or ""
+    tian_levels: Dict[str, int] = {}
+    for radical, _ in radicals_sorted:
         raw_level = raw_level_map.get(radical, 1)
-
         if max_raw_level <= 1:
-            tian_level = 1
+            tian_levels[radical] = 1
         else:
-            scaled_level = 1 + math.floor((raw_level - 1) * 59 / (max_raw_level - 1))
-            tian_level = min(60, max(1, scaled_level))
+            scaled_level = 1 + math.floor((raw_level - 1) * (max_level - 1) / (max_raw_level - 1))
+            tian_levels[radical] = min(max_level, max(1, scaled_level))
+    return radicals_sorted, productivity, tian_levels
+
+
+def radical_rows(
+    per_level: List[List[Tuple[str, List[str]]]],
+    decomposer,
+    levels: List[int] = LEVELS,
+    strokes: Optional[StrokeTable] = None,
+) -> List[RadicalRecord]:
+    """Level the radicals of ``per_level`` and return the sorted table rows.
+
+    Radicals tied on level and productivity are ordered by stroke count,
+    those without one last.
+    """
+    radicals_sorted, productivity, tian_levels = assign_tian_levels(per_level, levels)
+    strokes = StrokeTable() if strokes is None else strokes
+    stroke_counts = strokes.counts(radical for radical, _ in radicals_sorted)
+    strokes.save()
+
+    rows: List[RadicalRecord] = []
+    for radical, record in radicals_sorted:
+        radical_name = decomposer.get_radical_meaning(radical) or ""
         rows.append(
-            {
-                "radical": radical,
-                "tian_level": tian_level,
-                "radical_name": radical_name,
-                "hsk1_occurance": h1,
-                "hsk2_occurance": h2,
-                "hsk3_occurance": h3,
-                "productivity score": productivity,
-            }
+            RadicalRecord(
+                radical, tian_levels[radical], radical_name, record, productivity[radical], stroke_counts[radical]
+            )
         )
 
-    rows.sort(key=lambda r: (r["tian_level"], -r["productivity score"], r["radical"]))
-
-    write_csv(
-        rows,
-        [
-            "radical",
-            "tian_level",
-            "radical_name",
-            "hsk1_occurance",
-            "hsk2_occurance",
-            "hsk3_occurance",
-            "productivity score",
-        ],
-        OUTPUT_DIR / "radicals_levels_1_3.csv",
-    )
+    rows.sort(key=lambda r: (r.tian_level, -r.productivity_score, stroke_sort_key(r.stroke_count), r.radical))
+    return rows
+
+
+def build_radicals_csv(
+    decomposer=None,
+    write: bool = True,
+    levels: List[int] = LEVELS,
+    workers: Optional[int] = None,
+    strokes: Optional[StrokeTable] = None,
+) -> List[RadicalRecord]:
+    """Build the radical table; pass ``write=False`` to skip the CSV sink."""
+    if decomposer is None:
+        decomposer = create_decomposer()
+
+    per_level = collect_level_components(decomposer, levels, workers)
+    rows = radical_rows(per_level, decomposer, levels, strokes)
+    if isinstance(decomposer, CachedDecomposer):
+        decomposer.save()
+
+    if write:
+        write_csv(rows, radicals_headers(levels), output_path("radicals", levels))
+    return rows
 
 
 def main() -> None:
     build_radicals_csv()
+    record_table("radicals", LEVELS)
 
 
 if __name__ == "__main__":
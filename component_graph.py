@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+"""
+Recursive component graph below the hanzi components the radical table lacks.
+
+Hanzi are not nodes: a hanzi's tian_level is still the highest level among
+its hanzipy components (get_components, decomposition type 2). The graph
+only supplies levels for components with no radical row, so with the HSK
+lists, where every component has one, it is a fallback that never walks.
+
+Each node's children are its one-level ("once") hanzipy decomposition, walked
+down until a component with a known level (or a leaf) is reached, so
+components that are not themselves radicals in the table can still be
+resolved through their own parts. When every component already has a radical
+row, nothing is walked and no decomposition is requested. Self-loops are
+dropped and any cycle in the data is broken at the edge that closes it,
+leaving a DAG. Edges are cached next to the decomposition cache, keyed the
+same way.
+"""
+
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from build_profile import PROFILER
+from hanzipy_cache import read_json, write_json
+from hsk_csv_utils import CACHE_DIR
+
+COMPONENT_GRAPH_PATH = CACHE_DIR / "component_graph.json"
+# hanzipy decomposition type for the graph edges: one level at a time.
+ONCE = 1
+
+
+def decomposition_children(decomposition) -> List[str]:
+    if not isinstance(decomposition, dict):
+        return []
+    components = decomposition.get("components") or decomposition.get("once") or decomposition.get("radical")
+    if not isinstance(components, list):
+        return []
+    cleaned = [c for c in components if c and c != "No glyph available"]
+    return list(dict.fromkeys(cleaned))
+
+
+class ComponentGraph:
+    """Character -> direct components DAG."""
+
+    def __init__(self, edges: Dict[str, List[str]]) -> None:
+        self.edges = edges
+        self.broken_edges = 0
+        self.order = self._toposort()
+
+    def _toposort(self) -> List[str]:
+        """Children-first order; drops edges that would close a cycle."""
+        order: List[str] = []
+        state: Dict[str, int] = {}  # 1 = on the DFS stack, 2 = done
+        for root in self.edges:
+            if root in state:
+                continue
+            state[root] = 1
+            stack = [(root, iter(list(self.edges[root])))]
+            while stack:
+                node, children = stack[-1]
+                child = next(children, None)
+                if child is None:
+                    stack.pop()
+                    state[node] = 2
+                    order.append(node)
+                elif state.get(child) == 1:
+                    self.edges[node].remove(child)
+                    self.broken_edges += 1
+                elif child not in state:
+                    state[child] = 1
+                    stack.append((child, iter(list(self.edges.get(child, ())))))
+        return order
+
+    def resolve_levels(self, known: Dict[str, int]) -> Dict[str, int]:
+        """Extend ``known`` levels to every node in one children-first pass.
+
+        A node keeps its known level; otherwise it takes the highest level of
+        its children. Nodes with no known level anywhere below are left out.
+        """
+        levels = dict(known)
+        for node in self.order:
+            if node in levels:
+                continue
+            child_levels = [levels[c] for c in self.edges.get(node, ()) if c in levels]
+            if child_levels:
+                levels[node] = max(child_levels)
+        return levels
+
+    @classmethod
+    def build(
+        cls,
+        roots: Iterable[str],
+        decomposer,
+        edges: Optional[Dict[str, List[str]]] = None,
+        known: Optional[Dict[str, int]] = None,
+    ) -> "ComponentGraph":
+        """Walk ``roots`` down to leaves or ``known`` nodes, reusing already known ``edges``."""
+        edges = dict(edges or {})
+        known = known or {}
+        seen: Set[str] = set()
+        pending = [root for root in roots if root not in known]
+        with PROFILER.stage("component_graph.walk"):
+            while pending:
+                node = pending.pop()
+                if node in seen:
+                    continue
+                seen.add(node)
+                children = edges.get(node)
+                if children is None:
+                    PROFILER.count("component_graph.decompose")
+                    children = edges[node] = [
+                        c for c in decomposition_children(decomposer.decompose(node, ONCE)) if c != node
+                    ]
+                pending.extend(c for c in children if c not in known and c not in seen)
+        return cls(edges)
+
+
+def load_component_graph(
+    roots: Iterable[str],
+    decomposer,
+    known: Dict[str, int],
+    path: Path = COMPONENT_GRAPH_PATH,
+) -> ComponentGraph:
+    """Return the graph below the ``roots`` missing from ``known``, extending the cache as needed."""
+    key = getattr(decomposer, "key", None)
+    cached = read_json(path) if key is not None else None
+    edges = dict(cached.get("edges") or {}) if cached and cached.get("key") == key else {}
+    graph = ComponentGraph.build(roots, decomposer, edges, known)
+    PROFILER.hit("component_graph_cache", len(graph.edges) == len(edges))
+    if key is not None and len(graph.edges) != len(edges):
+        write_json({"key": key, "edges": graph.edges}, path)
+    return graph
@@ -3,47 +3,225 @@ from __future__ import annotations
 """
 Utility to determine Tian level for HSK 2025 vocab/hanzi inputs.
 
-Given a word/character, prints its Tian level (1-3) based on the existing
-HSK lists under references/HSK-3.0/New HSK (2025).
+Given a word/character, prints its Tian level based on the generated output
+CSVs (vocabulary, then hanzi, then radicals), falling back to the HSK lists
+under references/HSK-3.0/New HSK (2025) for terms the CSVs do not cover.
+
+Lookups go through a precompiled, sorted index file that is memory-mapped at
+startup and binary-searched, so batch mode (``--batch FILE`` or ``--batch -``
+for stdin) can stream tens of thousands of terms per second.
 """
 
+import csv
+import mmap
+import struct
+import sys
 from pathlib import Path
-from typing import List, Dict
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from hsk_csv_utils import (
+    CACHE_DIR,
+    LEVELS,
+    hanzi_sources,
+    output_path,
+    parse_levels,
+    read_entries,
+    word_sources,
+)
+
+INDEX_MAGIC = b"TIANIDX1"
+
+# (tian_level, hsk_level, kind); levels are "" when unknown.
+Entry = Tuple[str, str, str]
+
 
-from hsk_csv_utils import LEVELS, WORDS_DIR, HANZI_DIR, read_entries
+def index_path(levels: List[int] = LEVELS) -> Path:
+    """Return the compiled index path for a level range, e.g. .cache/tian_index_levels_1_3.bin."""
+    return CACHE_DIR / f"tian_index_levels_{min(levels)}_{max(levels)}.bin"
 
 
-def build_index() -> Dict[str, int]:
+def index_sources(levels: List[int] = LEVELS) -> List[Path]:
+    """Everything the index for ``levels`` is compiled from: output CSVs, then HSK lists."""
+    return [
+        output_path("vocabulary", levels),
+        output_path("hanzi", levels),
+        output_path("radicals", levels),
+        *word_sources(levels),
+        *hanzi_sources(levels),
+    ]
+
+
+def build_index(levels: List[int] = LEVELS) -> Dict[str, int]:
     index: Dict[str, int] = {}
-    # Vocab
-    for level in LEVELS:
-        vocab_path = WORDS_DIR / f"HSK_Level_{level}_words.txt"
-        if vocab_path.exists():
-            for w in read_entries(vocab_path):
-                index.setdefault(w, level)
-    # Hanzi
-    for level in LEVELS:
-        hanzi_path = HANZI_DIR / f"HSK_Level_{level}_hanzi.txt"
-        if hanzi_path.exists():
-            for h in read_entries(hanzi_path):
-                index.setdefault(h, level)
+    # Vocab, then hanzi
+    for level, path in [*zip(levels, word_sources(levels)), *zip(levels, hanzi_sources(levels))]:
+        if path.exists():
+            for term in read_entries(path):
+                index.setdefault(term, level)
     return index
 
 
-def define_tian_level(terms: List[str]) -> None:
-    index = build_index()
+def strip_sense_number(word: str) -> str:
+    # "本1" -> "本", matching normalize_vocab_key in build_hsk_vocab_csv.
+    return word.rstrip("0123456789") or word
+
+
+def collect_entries(levels: List[int] = LEVELS) -> Dict[str, Entry]:
+    """Merge the output CSVs (and HSK lists as a fallback) into one term map."""
+    entries: Dict[str, Entry] = {}
+    tables = [
+        (output_path("vocabulary", levels), "vocab", "word"),
+        (output_path("hanzi", levels), "hanzi", "hanzi"),
+        (output_path("radicals", levels), "radical", "radical"),
+    ]
+    for path, column, kind in tables:
+        if not path.exists():
+            continue
+        with path.open(encoding="utf-8") as handle:
+            for row in csv.DictReader(handle):
+                term = (row.get(column) or "").strip()
+                if not term:
+                    continue
+                entry = (row.get("tian_level") or "", row.get("hsk_level") or "", kind)
+                entries.setdefault(term, entry)
+                if kind == "word":
+                    entries.setdefault(strip_sense_number(term), entry)
+    for term, level in build_index(levels).items():
+        entries.setdefault(term, ("", str(level), "hsk"))
+    return entries
+
+
+def compile_index(path: Optional[Path] = None, levels: List[int] = LEVELS) -> int:
+    """Write the sorted lookup index and return the number of terms.
+
+    Layout: magic, uint32 count, count uint32 record offsets, then records of
+    ``term\\ttian\\thsk\\tkind\\n`` sorted by their UTF-8 term bytes.
+    """
+    path = path or index_path(levels)
+    entries = collect_entries(levels)
+    records = sorted(
+        (term.encode("utf-8"), "\t".join(entry).encode("utf-8")) for term, entry in entries.items()
+    )
+    header_size = len(INDEX_MAGIC) + 4 + 4 * len(records)
+    offsets: List[int] = []
+    blob = bytearray()
+    for term, fields in records:
+        offsets.append(header_size + len(blob))
+        blob += term + b"\t" + fields + b"\n"
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with tmp_path.open("wb") as handle:
+        handle.write(INDEX_MAGIC)
+        handle.write(struct.pack(f"<I{len(offsets)}I", len(offsets), *offsets))
+        handle.write(blob)
+    tmp_path.replace(path)
+    return len(records)
+
+
+def index_is_stale(path: Path, levels: List[int] = LEVELS) -> bool:
+    if not path.exists():
+        return True
+    built = path.stat().st_mtime
+    return any(source.exists() and source.stat().st_mtime > built for source in index_sources(levels))
+
+
+class TianIndex:
+    """Memory-mapped view of the compiled index with binary-search lookups."""
+
+    def __init__(self, path: Optional[Path] = None, levels: List[int] = LEVELS) -> None:
+        path = path or index_path(levels)
+        if index_is_stale(path, levels):
+            compile_index(path, levels)
+        with path.open("rb") as handle:
+            self._data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._data[: len(INDEX_MAGIC)] != INDEX_MAGIC:
+            raise SystemExit(f"{path} is not a TIAN index; delete it to rebuild.")
+        (self._count,) = struct.unpack_from("<I", self._data, len(INDEX_MAGIC))
+        self._offsets = len(INDEX_MAGIC) + 4
+
+    def _record(self, i: int) -> Tuple[bytes, int]:
+        (start,) = struct.unpack_from("<I", self._data, self._offsets + 4 * i)
+        tab = self._data.find(b"\t", start)
+        return self._data[start:tab], tab + 1
+
+    def lookup(self, term: str) -> Optional[Entry]:
+        key = term.encode("utf-8")
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            found, fields_start = self._record(mid)
+            if found < key:
+                lo = mid + 1
+            elif found > key:
+                hi = mid
+            else:
+                end = self._data.find(b"\n", fields_start)
+                tian, hsk, kind = self._data[fields_start:end].decode("utf-8").split("\t")
+                return tian, hsk, kind
+        return None
+
+
+def format_result(term: str, entry: Optional[Entry]) -> str:
+    """One tab-separated line: term, tian_level, hsk_level, kind."""
+    if entry is None:
+        return f"{term}\t\t\tnot found"
+    return "\t".join((term, *entry))
+
+
+def iter_terms(handle: TextIO) -> Iterator[str]:
+    for line in handle:
+        term = line.strip()
+        if term:
+            yield term
+
+
+def lookup_stream(terms: Iterable[str], out: TextIO, index: Optional[TianIndex] = None) -> None:
+    index = index or TianIndex()
+    write = out.write
     for term in terms:
-        level = index.get(term)
-        print(f"{term}: {level if level is not None else 'not found'}")
+        write(format_result(term, index.lookup(term)) + "\n")
 
 
-def main() -> None:
-    import sys
+def define_tian_level(terms: List[str], levels: List[int] = LEVELS) -> None:
+    index = TianIndex(levels=levels)
+    for term in terms:
+        entry = index.lookup(term)
+        level = (entry[0] or entry[1]) if entry is not None else None
+        print(f"{term}: {level if level else 'not found'}")
+
 
-    if len(sys.argv) < 2:
-        print("Usage: python define_tian_level.py <term1> [<term2> ...]")
+def run_lookup(
+    terms: List[str], batch: Optional[str] = None, compile: bool = False, levels: List[int] = LEVELS
+) -> None:
+    """Shared by this script's CLI and ``tian lookup``."""
+    if compile:
+        print(f"Indexed {compile_index(levels=levels)} terms into {index_path(levels)}")
+        return
+    if batch:
+        index = TianIndex(levels=levels)
+        if batch == "-":
+            lookup_stream(iter_terms(sys.stdin), sys.stdout, index)
+        else:
+            with open(batch, encoding="utf-8") as handle:
+                lookup_stream(iter_terms(handle), sys.stdout, index)
+        return
+    if not terms:
+        print("Usage: python define_tian_level.py <term1> [<term2> ...] | --batch FILE")
         sys.exit(1)
-    define_tian_level(sys.argv[1:])
+    define_tian_level(terms, levels)
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Look up the Tian level of words, hanzi and radicals.")
+    parser.add_argument("terms", nargs="*", help="Terms to look up.")
+    parser.add_argument("--batch", metavar="FILE", help="Read one term per line from FILE ('-' for stdin).")
+    parser.add_argument("--compile", action="store_true", help="Rebuild the lookup index and exit.")
+    parser.add_argument("--levels", type=parse_levels, default=LEVELS, help="HSK levels to look up in, e.g. 1-3 or 1-9.")
+    args = parser.parse_args()
+    run_lookup(args.terms, args.batch, args.compile, args.levels)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+"""
+Export the output CSVs as Anki decks, one .apkg per tian_level.
+
+Notes get stable GUIDs derived from the character/word, so importing a
+re-export updates existing cards instead of duplicating them. A term listed
+at several HSK levels becomes one note, in the deck of its lowest tian_level. A per-level
+digest of the exported rows is kept in .cache/anki_export.json and only
+levels whose rows changed are rewritten.
+"""
+
+import argparse
+import csv
+import hashlib
+import importlib
+import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from hanzipy_cache import read_json, write_json
+from hsk_csv_utils import CACHE_DIR, LEVELS, OUTPUT_DIR, default_workers, output_path
+
+ANKI_OUTPUT_DIR = OUTPUT_DIR / "anki"
+EXPORT_MANIFEST_PATH = CACHE_DIR / "anki_export.json"
+
+# Fixed IDs: changing these makes Anki treat re-exports as new note types.
+MODEL_IDS = {"radicals": 1707100001, "hanzi": 1707100002, "vocabulary": 1707100003}
+DECK_ID_BASE = 1707200000
+
+# table -> (key column, fields shown on the card)
+TABLE_FIELDS: Dict[str, Tuple[str, List[str]]] = {
+    "radicals": ("radical", ["radical", "radical_name", "tian_level", "productivity score"]),
+    "hanzi": (
+        "hanzi",
+        ["hanzi", "pinyin", "simple_meaning", "meaning", "components", "meaning_mnemonic", "reading_mnemonic", "tian_level"],
+    ),
+    "vocabulary": (
+        "vocab",
+        ["vocab", "pinyin", "simple_meaning", "meaning", "meaning_mnemonic", "reading_mnemonic", "tian_level"],
+    ),
+}
+
+CARD_CSS = ".card { font-family: sans-serif; text-align: center; } .term { font-size: 64px; }"
+
+Rows = Dict[str, List[Dict[str, str]]]
+
+
+def load_genanki():
+    try:
+        return importlib.import_module("genanki")
+    except Exception as exc:  # pragma: no cover
+        raise SystemExit(
+            "genanki is required but not available. "
+            "Install dependencies in the project venv: "
+            "./venv/Scripts/python.exe -m pip install -r requirements.txt\n"
+            f"Original error: {exc}"
+        )
+
+
+def load_rows_by_level(levels: List[int] = LEVELS) -> Dict[int, Rows]:
+    """Group every table's rows by tian_level, one row per key (its lowest level)."""
+    by_level: Dict[int, Rows] = {}
+    for table, (key_column, _) in TABLE_FIELDS.items():
+        path = output_path(table, levels)
+        if not path.exists():
+            continue
+        # Terms in several HSK lists (只, 一会儿, ...) have a row per list but
+        # share a note GUID, so only one of them may be exported.
+        first: Dict[str, Tuple[int, Dict[str, str]]] = {}
+        with path.open(encoding="utf-8") as handle:
+            for row in csv.DictReader(handle):
+                try:
+                    level = int(row.get("tian_level", ""))
+                except ValueError:
+                    continue
+                key = row[key_column]
+                if key not in first or level < first[key][0]:
+                    first[key] = (level, row)
+        for level, row in first.values():
+            by_level.setdefault(level, {}).setdefault(table, []).append(row)
+    return by_level
+
+
+def level_digest(rows: Rows) -> str:
+    exported = {
+        table: [[row.get(f, "") for f in TABLE_FIELDS[table][1]] for row in table_rows]
+        for table, table_rows in sorted(rows.items())
+    }
+    payload = json.dumps(exported, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def deck_path(level: int, out_dir: Path = ANKI_OUTPUT_DIR) -> Path:
+    return out_dir / f"TIAN_Level_{level:02d}.apkg"
+
+
+def build_models(genanki) -> Dict[str, object]:
+    models = {}
+    for table, (_, fields) in TABLE_FIELDS.items():
+        front = f'<div class="term">{{{{{fields[0]}}}}}</div>'
+        back = "{{FrontSide}}<hr id=answer>" + "".join(
+            f"{{{{#{f}}}}}<div>{{{{{f}}}}}</div>{{{{/{f}}}}}" for f in fields[1:]
+        )
+        models[table] = genanki.Model(
+            MODEL_IDS[table],
+            f"TIAN {table.capitalize()}",
+            fields=[{"name": f} for f in fields],
+            templates=[{"name": "Recognition", "qfmt": front, "afmt": back}],
+            css=CARD_CSS,
+        )
+    return models
+
+
+def export_level(level: int, rows: Rows, out_dir: Path = ANKI_OUTPUT_DIR) -> Path:
+    genanki = load_genanki()
+    models = build_models(genanki)
+    deck = genanki.Deck(DECK_ID_BASE + level, f"TIAN::Level {level:02d}")
+    for table in TABLE_FIELDS:
+        key_column, fields = TABLE_FIELDS[table]
+        for row in rows.get(table, []):
+            deck.add_note(
+                genanki.Note(
+                    model=models[table],
+                    fields=[row.get(f, "") or "" for f in fields],
+                    guid=genanki.guid_for("tian", table, row[key_column]),
+                )
+            )
+    path = deck_path(level, out_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    genanki.Package(deck).write_to_file(str(path))
+    return path
+
+
+def export_level_job(job: Tuple[int, Rows, Path]) -> Path:
+    return export_level(*job)
+
+
+def export_decks(
+    levels: List[int] = LEVELS,
+    out_dir: Path = ANKI_OUTPUT_DIR,
+    force: bool = False,
+    workers: Optional[int] = None,
+) -> List[Path]:
+    """Write one deck per tian_level, skipping levels whose rows are unchanged."""
+    by_level = load_rows_by_level(levels)
+    manifest = read_json(EXPORT_MANIFEST_PATH) or {}
+    digests = {str(level): level_digest(rows) for level, rows in by_level.items()}
+    changed = [
+        level
+        for level in sorted(by_level)
+        if force or manifest.get(str(level)) != digests[str(level)] or not deck_path(level, out_dir).exists()
+    ]
+    jobs = [(level, by_level[level], out_dir) for level in changed]
+    workers = default_workers() if workers is None else workers
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            written = list(pool.map(export_level_job, jobs))
+    else:
+        written = [export_level_job(job) for job in jobs]
+
+    # Levels that no longer have rows lose their deck, manifest or not.
+    for path in out_dir.glob("TIAN_Level_*.apkg"):
+        level = path.stem.rpartition("_")[2]
+        if level.isdigit() and str(int(level)) not in digests:
+            path.unlink()
+    write_json(digests, EXPORT_MANIFEST_PATH)
+    return written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export the TIAN CSVs as one Anki deck per tian_level.")
+    parser.add_argument("--force", action="store_true", help="Rewrite every deck, changed or not.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+    args = parser.parse_args()
+    written = export_decks(force=args.force, workers=args.workers)
+    print(f"Wrote {len(written)} deck(s) to {ANKI_OUTPUT_DIR}")
+
+
+if __name__ == "__main__":
+    main()
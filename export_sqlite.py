@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+"""
+Export the TIAN tables into a single indexed SQLite file for app use.
+
+Besides the radicals/hanzi/vocabulary tables, the database has normalized
+``hanzi_components`` (from the ``components`` column) and ``vocabulary_hanzi``
+link tables, indexes on tian_level/hsk_level, and an FTS5 table over the
+meanings. Everything is bulk-inserted in one transaction into a temporary
+file that replaces the old database only once complete.
+
+    SELECT hanzi FROM hanzi WHERE tian_level = 5;
+    SELECT hanzi FROM hanzi_components WHERE component = '口';
+    SELECT vocab_id FROM vocabulary_hanzi GROUP BY vocab_id HAVING MAX(hanzi_level) <= 5;
+    SELECT term FROM meaning_fts WHERE meaning_fts MATCH 'water';
+"""
+
+import argparse
+import csv
+import re
+import sqlite3
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from build_hsk_vocab_csv import normalize_vocab_key
+from hsk_csv_utils import LEVELS, OUTPUT_DIR, output_path
+
+INTEGER_COLUMNS = re.compile(r"^(tian_level|hsk_level|hsk\d+_occurance|productivity_score|stroke_count)$")
+TABLE_KEYS = {"radicals": "radical", "hanzi": "hanzi", "vocabulary": "vocab"}
+
+
+def sqlite_path(levels: List[int] = LEVELS) -> Path:
+    return OUTPUT_DIR / f"tian_{min(levels)}_{max(levels)}.sqlite"
+
+
+def column_name(header: str) -> str:
+    return re.sub(r"\W+", "_", header.strip())
+
+
+def cell(value: str, is_int: bool) -> object:
+    """An integer column's value as an int, NULL when empty (e.g. an unknown stroke count)."""
+    if not is_int:
+        return value
+    if not value.strip():
+        return None
+    return int(value) if value.strip().lstrip("-").isdigit() else value
+
+
+def read_table(path: Path) -> Tuple[List[str], List[Tuple[object, ...]]]:
+    """Return (column names, rows) with integer columns converted."""
+    with path.open(encoding="utf-8") as handle:
+        reader = csv.reader(handle)
+        headers = [column_name(h) for h in next(reader, [])]
+        integer = [bool(INTEGER_COLUMNS.match(h)) for h in headers]
+        rows = [tuple(cell(v, is_int) for v, is_int in zip(row, integer)) for row in reader]
+    return headers, rows
+
+
+def has_fts5(conn: sqlite3.Connection) -> bool:
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE temp.fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def create_table(conn: sqlite3.Connection, table: str, headers: List[str], rows: List[Tuple[object, ...]]) -> None:
+    columns = ", ".join(
+        f'"{h}" INTEGER' if INTEGER_COLUMNS.match(h) else f'"{h}" TEXT' for h in headers
+    )
+    conn.execute(f'CREATE TABLE "{table}" (id INTEGER PRIMARY KEY, {columns})')
+    placeholders = ", ".join("?" for _ in headers)
+    names = ", ".join(f'"{h}"' for h in headers)
+    conn.executemany(f'INSERT INTO "{table}" ({names}) VALUES ({placeholders})', rows)
+    conn.execute(f'CREATE INDEX "idx_{table}_key" ON "{table}" ("{TABLE_KEYS[table]}")')
+    for column in ("tian_level", "hsk_level"):
+        if column in headers:
+            conn.execute(f'CREATE INDEX "idx_{table}_{column}" ON "{table}" ("{column}")')
+
+
+def export_sqlite(levels: List[int] = LEVELS, path: Optional[Path] = None) -> Dict[str, int]:
+    """Write the database and return the row count per table."""
+    path = path or sqlite_path(levels)
+    tables: Dict[str, Tuple[List[str], List[Tuple[object, ...]]]] = {}
+    for table in TABLE_KEYS:
+        source = output_path(table, levels)
+        if source.exists():
+            tables[table] = read_table(source)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.unlink(missing_ok=True)
+    conn = sqlite3.connect(tmp_path)
+    counts: Dict[str, int] = {}
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        with conn:
+            for table, (headers, rows) in tables.items():
+                create_table(conn, table, headers, rows)
+                counts[table] = len(rows)
+
+            conn.execute(
+                "CREATE TABLE hanzi_components (hanzi_id INTEGER, hanzi TEXT, component TEXT, position INTEGER)"
+            )
+            conn.executemany(
+                "INSERT INTO hanzi_components VALUES (?, ?, ?, ?)",
+                (
+                    (hanzi_id, hanzi, component, position)
+                    for hanzi_id, hanzi, components in conn.execute("SELECT id, hanzi, components FROM hanzi")
+                    for position, component in enumerate((components or "").split())
+                )
+                if "hanzi" in tables
+                else (),
+            )
+            conn.execute("CREATE INDEX idx_hanzi_components_component ON hanzi_components (component)")
+            conn.execute("CREATE INDEX idx_hanzi_components_hanzi ON hanzi_components (hanzi)")
+
+            # hanzi_level is the character's lowest tian_level; characters with no
+            # hanzi row take the word's own level, as the vocabulary stage does.
+            hanzi_levels: Dict[str, int] = {}
+            if "hanzi" in tables:
+                for hanzi, level in conn.execute("SELECT hanzi, MIN(tian_level) FROM hanzi GROUP BY hanzi"):
+                    hanzi_levels[hanzi] = level
+            conn.execute(
+                "CREATE TABLE vocabulary_hanzi (vocab_id INTEGER, vocab TEXT, hanzi TEXT, position INTEGER, hanzi_level INTEGER)"
+            )
+            conn.executemany(
+                "INSERT INTO vocabulary_hanzi VALUES (?, ?, ?, ?, ?)",
+                (
+                    (vocab_id, vocab, ch, position, hanzi_levels.get(ch, tian_level))
+                    for vocab_id, vocab, tian_level in conn.execute("SELECT id, vocab, tian_level FROM vocabulary")
+                    for position, ch in enumerate(normalize_vocab_key(vocab))
+                )
+                if "vocabulary" in tables
+                else (),
+            )
+            conn.execute("CREATE INDEX idx_vocabulary_hanzi_hanzi ON vocabulary_hanzi (hanzi)")
+            conn.execute("CREATE INDEX idx_vocabulary_hanzi_vocab ON vocabulary_hanzi (vocab_id)")
+
+            if has_fts5(conn):
+                conn.execute("CREATE VIRTUAL TABLE meaning_fts USING fts5(term, kind UNINDEXED, meaning)")
+                for table in ("hanzi", "vocabulary"):
+                    if table in tables:
+                        key = TABLE_KEYS[table]
+                        conn.execute(
+                            f"INSERT INTO meaning_fts (term, kind, meaning) "
+                            f"SELECT \"{key}\", '{table}', trim(simple_meaning || ' ' || meaning) "
+                            f"FROM \"{table}\" WHERE meaning != '' OR simple_meaning != ''"
+                        )
+            else:
+                print("SQLite was built without FTS5; skipping meaning_fts.")
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    tmp_path.replace(path)
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export the TIAN CSVs into an indexed SQLite database.")
+    parser.add_argument("--output", type=Path, default=None, help="Database path (default: output/tian_<levels>.sqlite).")
+    args = parser.parse_args()
+    counts = export_sqlite(path=args.output)
+    print(", ".join(f"{table}: {count}" for table, count in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+"""
+Generate ``meaning_mnemonic``/``reading_mnemonic`` values with an LLM.
+
+Rows are sent as concurrent asyncio requests through the OpenAI client, with
+bounded concurrency and retry with exponential backoff. Every response is
+appended to a prompt-hash cache, so reruns (or a crashed run resumed) never
+pay for the same row twice. Results go to output/mnemonics.json, keyed by
+character or word, which the hanzi and vocabulary stages merge into their
+rows; the build then reruns so the CSVs and the build manifest pick them up.
+Point ``--base-url`` (or OPENAI_BASE_URL) at a local stub server to test
+without the real API.
+
+    python generate_mnemonics.py --tables hanzi,vocabulary --concurrency 32
+"""
+
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import random
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from hsk_csv_utils import CACHE_DIR, LEVELS, MNEMONIC_COLUMNS, MNEMONICS_PATH, load_mnemonics, output_path
+
+CACHE_PATH = CACHE_DIR / "mnemonics.jsonl"
+DEFAULT_MODEL = os.environ.get("TIAN_MNEMONIC_MODEL", "gpt-4o-mini")
+KEY_COLUMNS = {"hanzi": "hanzi", "vocabulary": "vocab"}
+
+SYSTEM_PROMPT = (
+    "You write short, vivid memory aids for learners of Mandarin Chinese. "
+    'Reply with a JSON object: {"meaning_mnemonic": "...", "reading_mnemonic": "..."}. '
+    "The meaning mnemonic links the form (and components) to the meaning; the reading "
+    "mnemonic links it to the pinyin sound. One or two sentences each."
+)
+
+
+def build_prompt(table: str, row: Dict[str, str]) -> str:
+    term = row[KEY_COLUMNS[table]]
+    fields = [
+        f"{'Character' if table == 'hanzi' else 'Word'}: {term}",
+        f"Pinyin: {row.get('pinyin', '')}",
+        f"Meaning: {row.get('meaning') or row.get('simple_meaning') or 'unknown'}",
+    ]
+    if row.get("components"):
+        fields.append(f"Components: {row['components']}")
+    return "\n".join(fields)
+
+
+def prompt_key(model: str, prompt: str) -> str:
+    return hashlib.sha256(f"{model}\n{SYSTEM_PROMPT}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+class MnemonicCache:
+    """Append-only JSONL cache of responses keyed by prompt hash."""
+
+    def __init__(self, path: Path = CACHE_PATH) -> None:
+        self.path = path
+        self.entries: Dict[str, Dict[str, str]] = {}
+        if path.exists():
+            with path.open(encoding="utf-8") as handle:
+                for line in handle:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # a torn last line from an interrupted run
+                    self.entries[record["key"]] = record["value"]
+
+    def get(self, key: str) -> Optional[Dict[str, str]]:
+        return self.entries.get(key)
+
+    def put(self, key: str, value: Dict[str, str]) -> None:
+        self.entries[key] = value
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as handle:
+            handle.write(json.dumps({"key": key, "value": value}, ensure_ascii=False) + "\n")
+
+
+def save_mnemonics(store: Dict[str, Dict[str, Dict[str, str]]], path: Path = MNEMONICS_PATH) -> None:
+    """Write the mnemonic store atomically, dropping entries that are still empty."""
+    data = {
+        table: {term: values for term, values in sorted(entries.items()) if any(values.values())}
+        for table, entries in sorted(store.items())
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as handle:
+        json.dump(data, handle, ensure_ascii=False, indent=1)
+        handle.write("\n")
+    os.replace(tmp_path, path)
+
+
+def parse_response(text: str) -> Dict[str, str]:
+    data = json.loads(text)
+    return {
+        "meaning_mnemonic": str(data.get("meaning_mnemonic", "")).strip(),
+        "reading_mnemonic": str(data.get("reading_mnemonic", "")).strip(),
+    }
+
+
+def create_client(base_url: Optional[str]):
+    try:
+        from dotenv import load_dotenv
+        from openai import AsyncOpenAI
+    except ImportError as exc:  # pragma: no cover
+        raise SystemExit(
+            "openai and python-dotenv are required. "
+            "Install dependencies in the project venv: "
+            "./venv/Scripts/python.exe -m pip install -r requirements.txt\n"
+            f"Original error: {exc}"
+        )
+    load_dotenv()
+    # Retries are handled here so backoff is shared with the concurrency limit.
+    return AsyncOpenAI(base_url=base_url, api_key=os.environ.get("OPENAI_API_KEY", "stub"), max_retries=0)
+
+
+async def request_mnemonic(client, model: str, prompt: str, retries: int, backoff: float) -> Dict[str, str]:
+    for attempt in range(retries + 1):
+        try:
+            response = await client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt},
+                ],
+                response_format={"type": "json_object"},
+            )
+            return parse_response(response.choices[0].message.content or "")
+        except Exception:
+            if attempt == retries:
+                raise
+            await asyncio.sleep(backoff * (2**attempt) * (1 + random.random()))
+    raise AssertionError("unreachable")
+
+
+async def fill_rows(
+    jobs: List[Tuple[Dict[str, str], str]],
+    cache: MnemonicCache,
+    model: str,
+    base_url: Optional[str],
+    concurrency: int,
+    retries: int,
+    backoff: float,
+) -> Tuple[int, int]:
+    """Fill each (entry, prompt) job in place; return (cached, failed) counts."""
+    pending: Dict[str, List[Dict[str, str]]] = {}
+    cached = 0
+    for entry, prompt in jobs:
+        key = prompt_key(model, prompt)
+        value = cache.get(key)
+        if value is not None:
+            entry.update(value)
+            cached += 1
+        else:
+            pending.setdefault(key, []).append(entry)
+    if not pending:
+        return cached, 0
+
+    client = create_client(base_url)
+    semaphore = asyncio.Semaphore(concurrency)
+    prompts = {prompt_key(model, prompt): prompt for _, prompt in jobs}
+    failed = 0
+
+    async def run(key: str) -> None:
+        nonlocal failed
+        async with semaphore:
+            try:
+                value = await request_mnemonic(client, model, prompts[key], retries, backoff)
+            except Exception as exc:
+                failed += len(pending[key])
+                print(f"Giving up on {prompts[key].splitlines()[0]}: {exc}")
+                return
+        cache.put(key, value)
+        for entry in pending[key]:
+            entry.update(value)
+
+    await asyncio.gather(*(run(key) for key in pending))
+    return cached, failed
+
+
+def load_table(path: Path) -> Tuple[List[str], List[Dict[str, str]]]:
+    with path.open(encoding="utf-8") as handle:
+        reader = csv.DictReader(handle)
+        return list(reader.fieldnames or []), list(reader)
+
+
+def generate_mnemonics(
+    tables: List[str],
+    levels: List[int] = LEVELS,
+    model: str = DEFAULT_MODEL,
+    base_url: Optional[str] = None,
+    concurrency: int = 16,
+    retries: int = 5,
+    backoff: float = 0.5,
+    limit: Optional[int] = None,
+    build: bool = True,
+) -> None:
+    """Fill missing mnemonics for ``tables`` into the store, then rebuild.
+
+    Pass ``build=False`` to only update the store; the next build merges it.
+    """
+    cache = MnemonicCache(CACHE_PATH)
+    store = {table: load_mnemonics(table, MNEMONICS_PATH) for table in KEY_COLUMNS}
+    updated = False
+    for table in tables:
+        path = output_path(table, levels)
+        if not path.exists():
+            print(f"Skipping {table}: {path} not found")
+            continue
+        _, rows = load_table(path)
+        entries = store[table]
+        missing: Dict[str, Tuple[Dict[str, str], str]] = {}
+        for row in rows:
+            term = row[KEY_COLUMNS[table]]
+            entry = entries.setdefault(term, dict.fromkeys(MNEMONIC_COLUMNS, ""))
+            if not all(entry.values()) and term not in missing:
+                missing[term] = (entry, build_prompt(table, row))
+        jobs = list(missing.values())[:limit]
+        cached, failed = asyncio.run(fill_rows(jobs, cache, model, base_url, concurrency, retries, backoff))
+        updated = updated or len(jobs) > failed
+        print(f"{table}: {len(jobs)} rows needed mnemonics ({cached} from cache, {failed} failed)")
+    if not updated:
+        return
+    save_mnemonics(store, MNEMONICS_PATH)
+    if build:
+        from build_hsk_csv import run_pipeline
+
+        run_pipeline(levels=levels)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate meaning/reading mnemonics for the output CSVs.")
+    parser.add_argument("--tables", default="hanzi,vocabulary", help="Comma-separated tables to fill.")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--base-url", default=os.environ.get("OPENAI_BASE_URL"), help="API base URL (e.g. a local stub).")
+    parser.add_argument("--concurrency", type=int, default=16, help="Maximum requests in flight.")
+    parser.add_argument("--retries", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=None, help="Only fill the first N missing rows per table.")
+    parser.add_argument("--no-build", action="store_true", help="Only update output/mnemonics.json; skip the rebuild.")
+    args = parser.parse_args()
+    tables = [t.strip() for t in args.tables.split(",") if t.strip() in KEY_COLUMNS]
+    generate_mnemonics(
+        tables,
+        model=args.model,
+        base_url=args.base_url,
+        concurrency=args.concurrency,
+        retries=args.retries,
+        limit=args.limit,
+        build=not args.no_build,
+    )
+
+
+if __name__ == "__main__":
+    main()
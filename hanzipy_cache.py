@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import json
+import marshal
+import os
+import sys
+from functools import lru_cache
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from build_profile import PROFILER
+from hsk_csv_utils import CACHE_DIR, file_digest
+
+# On-disk caches for hanzipy results shared by all build stages.
+
+# Binary snapshot of every hanzipy result the pipeline has needed:
+# decompositions, radical meanings and dictionary pinyins, in one marshal
+# payload behind a magic header.
+SNAPSHOT_PATH = CACHE_DIR / "hanzipy.snapshot"
+SNAPSHOT_MAGIC = b"TIANSNAP1\n"
+SNAPSHOT_SECTIONS = ("decompositions", "radical_meanings", "pinyins")
+
+Sections = Dict[str, Dict[str, object]]
+
+# path -> ((mtime_ns, size), sections) of the last snapshot read.
+_SNAPSHOTS: Dict[Path, Tuple[Tuple[int, int], Sections]] = {}
+
+
+@lru_cache(maxsize=None)
+def hanzipy_version() -> str:
+    try:
+        from importlib.metadata import version
+
+        return version("hanzipy")
+    except Exception:
+        return "unknown"
+
+
+@lru_cache(maxsize=None)
+def cedict_digest() -> str:
+    """Digest of the CC-CEDICT file bundled with hanzipy, found without importing it."""
+    try:
+        spec = find_spec("hanzipy")
+    except (ImportError, ValueError):
+        spec = None
+    if spec is None or not spec.origin:
+        return ""
+    return file_digest(Path(spec.origin).parent / "data" / "cedict_ts.u8")
+
+
+def read_json(path: Path) -> Optional[Dict[str, object]]:
+    if not path.exists():
+        return None
+    try:
+        with path.open(encoding="utf-8") as handle:
+            data = json.load(handle)
+    except (OSError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def runtime_key() -> Dict[str, str]:
+    """The interpreter and marshal format, since marshal data is only portable within both."""
+    return {"python": f"{sys.version_info[0]}.{sys.version_info[1]}", "marshal": str(marshal.version)}
+
+
+def snapshot_key() -> Dict[str, str]:
+    return {"hanzipy": hanzipy_version(), "cedict": cedict_digest(), **runtime_key()}
+
+
+def read_snapshot(path: Path = SNAPSHOT_PATH) -> Sections:
+    """Snapshot sections, empty if the file is missing, torn or from another hanzipy or Python.
+
+    Reads are memoized per (mtime, size), so the decomposer and dictionary of
+    one process share a single load. Callers must copy before mutating.
+    """
+    empty: Sections = {section: {} for section in SNAPSHOT_SECTIONS}
+    try:
+        stat = path.stat()
+    except OSError:
+        return empty
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cached = _SNAPSHOTS.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    try:
+        with PROFILER.stage("hanzipy.snapshot_load"):
+            data = path.read_bytes()
+            payload = marshal.loads(data[len(SNAPSHOT_MAGIC) :]) if data.startswith(SNAPSHOT_MAGIC) else None
+    except (OSError, EOFError, ValueError, TypeError):
+        payload = None
+    if not isinstance(payload, dict) or payload.get("key") != snapshot_key():
+        return empty
+    sections = {section: dict(payload.get(section) or {}) for section in SNAPSHOT_SECTIONS}
+    _SNAPSHOTS[path] = (stamp, sections)
+    return sections
+
+
+def update_snapshot(updates: Sections, path: Path = SNAPSHOT_PATH) -> None:
+    """Merge ``updates`` (section -> entries) into the snapshot, written atomically."""
+    sections = {section: dict(entries) for section, entries in read_snapshot(path).items()}
+    for section, entries in updates.items():
+        sections[section].update(entries)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(SNAPSHOT_MAGIC + marshal.dumps({"key": snapshot_key(), **sections}))
+    os.replace(tmp_path, path)
+    _SNAPSHOTS.pop(path, None)
+
+
+def write_json(data: Dict[str, object], path: Path) -> None:
+    """Write JSON atomically so an interrupted build never leaves a torn cache."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as handle:
+        json.dump(data, handle, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class CachedDecomposer:
+    """HanziDecomposer stand-in backed by the hanzipy snapshot.
+
+    Entries come from the snapshot, which is only invalidated by a different
+    hanzipy or Python, so editing the HSK lists costs lookups for the new
+    characters alone. The real decomposer is only constructed on the first miss, so a
+    warm rebuild never loads hanzipy's decomposition data. ``key`` (the
+    hanzipy version and runtime_key) also keys caches derived from it, such
+    as the component graph.
+    """
+
+    def __init__(self, factory: Callable[[], object], path: Path = SNAPSHOT_PATH) -> None:
+        self._factory = factory
+        self._decomposer = None
+        self.path = path
+        self.key = {"hanzipy": hanzipy_version(), **runtime_key()}
+        snapshot = read_snapshot(path)
+        self._decompositions: Dict[str, object] = dict(snapshot["decompositions"])
+        self._radical_meanings: Dict[str, Optional[str]] = dict(snapshot["radical_meanings"])
+        self._new_decompositions: Dict[str, object] = {}
+        self._new_radical_meanings: Dict[str, Optional[str]] = {}
+        self._dirty = False
+
+    @property
+    def decomposer(self):
+        if self._decomposer is None:
+            with PROFILER.stage("hanzipy.decomposer_init"):
+                self._decomposer = self._factory()
+        return self._decomposer
+
+    def decompose(self, hanzi: str, decomposition_type: Optional[int] = None):
+        key = f"{decomposition_type}:{hanzi}"
+        PROFILER.hit("decomposition_cache", key in self._decompositions)
+        if key not in self._decompositions:
+            decomposer = self.decomposer
+            with PROFILER.stage("hanzipy.decompose"):
+                self._decompositions[key] = decomposer.decompose(hanzi, decomposition_type)
+            self._new_decompositions[key] = self._decompositions[key]
+            self._dirty = True
+        return self._decompositions[key]
+
+    def misses(self, characters: Iterable[str], decomposition_type: Optional[int] = None) -> int:
+        """How many distinct ``characters`` would miss the cache for ``decomposition_type``."""
+        return sum(f"{decomposition_type}:{hanzi}" not in self._decompositions for hanzi in set(characters))
+
+    def get_radical_meaning(self, radical: str) -> Optional[str]:
+        PROFILER.hit("radical_meaning_cache", radical in self._radical_meanings)
+        if radical not in self._radical_meanings:
+            self._radical_meanings[radical] = self.decomposer.get_radical_meaning(radical)
+            self._new_radical_meanings[radical] = self._radical_meanings[radical]
+            self._dirty = True
+        return self._radical_meanings[radical]
+
+    def new_entries(self) -> Dict[str, Dict[str, object]]:
+        """Entries added since loading, for handing back from a worker process."""
+        return {
+            "decompositions": dict(self._new_decompositions),
+            "radical_meanings": dict(self._new_radical_meanings),
+        }
+
+    def merge(self, entries: Dict[str, Dict[str, object]]) -> None:
+        """Adopt entries computed by another CachedDecomposer (e.g. a worker)."""
+        for key, value in entries.get("decompositions", {}).items():
+            if key not in self._decompositions:
+                self._decompositions[key] = value
+                self._dirty = True
+        for key, value in entries.get("radical_meanings", {}).items():
+            if key not in self._radical_meanings:
+                self._radical_meanings[key] = value
+                self._dirty = True
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        update_snapshot(
+            {"decompositions": self._decompositions, "radical_meanings": self._radical_meanings},
+            self.path,
+        )
+        self._dirty = False
+
+
+def dictionary_pinyins(hanzi: str, dictionary) -> List[str]:
+    """Raw numbered pinyins for ``hanzi``, skipping archaic readings."""
+    PROFILER.count("dictionary.definition_lookup")
+    with PROFILER.stage("hanzipy.definition_lookup"):
+        entries = dictionary.definition_lookup(hanzi) or []
+    filtered: List[str] = []
+
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        definition = str(entry.get("definition") or "")
+        if "(archaic)" in definition.lower():
+            continue
+        pinyin = str(entry.get("pinyin") or "").strip()
+        if pinyin:
+            filtered.append(pinyin)
+
+    if filtered:
+        return filtered
+
+    # Fallback: if CC-CEDICT has no entry, use get_pinyin.
+    PROFILER.count("dictionary.get_pinyin")
+    return dictionary.get_pinyin(hanzi) or []
+
+
+class CachedDictionary:
+    """Batched pinyin lookups over HanziDictionary, memoized in the hanzipy snapshot.
+
+    The snapshot is keyed by the hanzipy version, the digest of its CC-CEDICT
+    file and the Python/marshal version, so it survives changes to the HSK lists and is shared by
+    every stage. HanziDictionary (several seconds to load) is only built when
+    a lookup misses.
+    """
+
+    def __init__(self, factory: Callable[[], object], path: Path = SNAPSHOT_PATH) -> None:
+        self._factory = factory
+        self._dictionary = None
+        self.path = path
+        self.key = snapshot_key()
+        self._pinyins: Dict[str, List[str]] = dict(read_snapshot(path)["pinyins"])
+        self._new_pinyins: Dict[str, List[str]] = {}
+        self._dirty = False
+
+    @property
+    def dictionary(self):
+        if self._dictionary is None:
+            with PROFILER.stage("hanzipy.dictionary_init"):
+                self._dictionary = self._factory()
+        return self._dictionary
+
+    def pinyins(self, hanzi: str) -> List[str]:
+        PROFILER.hit("dictionary_cache", hanzi in self._pinyins)
+        if hanzi not in self._pinyins:
+            self._pinyins[hanzi] = dictionary_pinyins(hanzi, self.dictionary)
+            self._new_pinyins[hanzi] = self._pinyins[hanzi]
+            self._dirty = True
+        return self._pinyins[hanzi]
+
+    def misses(self, characters: Iterable[str]) -> int:
+        """How many distinct ``characters`` would miss the cache."""
+        return sum(hanzi not in self._pinyins for hanzi in set(characters))
+
+    def lookup_many(self, characters: Iterable[str]) -> Dict[str, List[str]]:
+        """Pinyins for a whole character set, each distinct character looked up once."""
+        return {hanzi: self.pinyins(hanzi) for hanzi in dict.fromkeys(characters)}
+
+    def new_entries(self) -> Dict[str, Dict[str, List[str]]]:
+        return {"pinyins": dict(self._new_pinyins)}
+
+    def merge(self, entries: Dict[str, Dict[str, List[str]]]) -> None:
+        for key, value in entries.get("pinyins", {}).items():
+            if key not in self._pinyins:
+                self._pinyins[key] = value
+                self._dirty = True
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        update_snapshot({"pinyins": self._pinyins}, self.path)
+        self._dirty = False
@@ -1,8 +1,15 @@
 from __future__ import annotations
 
 import csv
+import hashlib
+import json
+import os
+from functools import lru_cache
 from pathlib import Path
-from typing import Iterable, List, Dict
+from typing import Callable, Iterable, List, Dict, Optional, TypeVar
+
+from build_profile import PROFILER
+from lexicon_records import Record
 
 # Shared utilities/constants for generating HSK 2025 CSV outputs.
 
@@ -11,8 +18,40 @@ DATA_DIR = BASE_DIR / "references" / "HSK-3.0" / "New HSK (2025)"
 HANZI_DIR = DATA_DIR / "HSK Hanzi"
 WORDS_DIR = DATA_DIR / "HSK Words"
 OUTPUT_DIR = BASE_DIR / "output"
+CACHE_DIR = BASE_DIR / ".cache"
+
+MAX_LEVEL = 9
+
+T = TypeVar("T")
+
+
+def parse_levels(spec: str) -> List[int]:
+    """Parse a level spec such as "1-3", "1,2,3" or "1-6,7-9" into sorted levels."""
+    levels: set[int] = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        levels.update(range(int(start), int(end or start) + 1))
+    if not levels or min(levels) < 1 or max(levels) > MAX_LEVEL:
+        raise ValueError(f"HSK levels must be within 1-{MAX_LEVEL}: {spec!r}")
+    return sorted(levels)
+
+
+# Override with e.g. TIAN_LEVELS=1-9 to build the full HSK 3.0 range.
+LEVELS: List[int] = parse_levels(os.environ.get("TIAN_LEVELS", "1-3"))
 
-LEVELS: List[int] = [1, 2, 3]
+
+def output_path(table: str, levels: Iterable[int] = LEVELS) -> Path:
+    """Return the output CSV path for a table, e.g. output/hanzi_levels_1_3.csv."""
+    levels = list(levels)
+    return OUTPUT_DIR / f"{table}_levels_{min(levels)}_{max(levels)}.csv"
+
+
+RADICALS_CSV_PATH = output_path("radicals")
+HANZI_CSV_PATH = output_path("hanzi")
+VOCAB_CSV_PATH = output_path("vocabulary")
 
 
 TONE_MARKS = {
@@ -25,61 +64,131 @@ TONE_MARKS = {
 }
 
 
+def convert_syllable(syllable: str) -> str:
+    """Convert one numbered syllable (e.g. 'xue3') to tone marks."""
+    if not syllable:
+        return syllable
+
+    syllable = syllable.replace("u:", "ü").replace("U:", "Ü")
+
+    tone = 5
+    if syllable[-1].isdigit():
+        tone = int(syllable[-1])
+        syllable = syllable[:-1]
+
+    if tone in (0, 5):
+        return syllable
+
+    lower = syllable.lower()
+    vowels = "aeiouü"
+    vowel_positions = [i for i, ch in enumerate(lower) if ch in vowels]
+    if not vowel_positions:
+        return syllable
+
+    # Tone placement rules:
+    # - If 'a' or 'e' present, mark the first of those.
+    # - Else if 'ou' present, mark the 'o'.
+    # - Else for 'iu' mark 'u', for 'ui' mark 'i'.
+    # - Else mark the last vowel.
+    mark_index = None
+    for v in ("a", "e"):
+        idx = lower.find(v)
+        if idx != -1:
+            mark_index = idx
+            break
+    if mark_index is None and "ou" in lower:
+        mark_index = lower.find("o")
+    if mark_index is None and "iu" in lower:
+        mark_index = lower.find("u")
+    if mark_index is None and "ui" in lower:
+        mark_index = lower.find("i")
+    if mark_index is None:
+        mark_index = vowel_positions[-1]
+
+    ch = lower[mark_index]
+    marked = TONE_MARKS.get(ch, [ch, ch, ch, ch])[tone - 1]
+    # Preserve original case of the vowel being replaced
+    if syllable[mark_index].isupper():
+        marked = marked.upper()
+
+    return syllable[:mark_index] + marked + syllable[mark_index + 1 :]
+
+
+PINYIN_INITIALS = [
+    "", "b", "p", "m", "f", "d", "t", "n", "l", "g", "k", "h",
+    "j", "q", "x", "zh", "ch", "sh", "r", "z", "c", "s", "y", "w",
+]
+PINYIN_FINALS = [
+    "a", "o", "e", "i", "u", "v", "ü", "u:", "ai", "ei", "ao", "ou", "an", "en", "ang", "eng",
+    "ong", "er", "ia", "ie", "iao", "iu", "ian", "in", "iang", "ing", "iong", "ua", "uo",
+    "uai", "ui", "uan", "un", "uang", "ue", "üe", "u:e", "üan", "u:an", "ün", "u:n", "r",
+]
+
+
+@lru_cache(maxsize=None)
+def syllable_table() -> Dict[str, str]:
+    """Precompute tone-mark forms for every initial/final/tone combination.
+
+    The grid over-generates (not every pairing is a Mandarin syllable), which
+    is harmless; the ~6k-entry table is built once, on first conversion.
+    """
+    table: Dict[str, str] = {}
+    for initial in PINYIN_INITIALS:
+        for final in PINYIN_FINALS:
+            base = initial + final
+            for suffix in ("", "1", "2", "3", "4", "5"):
+                syllable = base + suffix
+                table[syllable] = convert_syllable(syllable)
+    return table
+
+
+@lru_cache(maxsize=4096)
+def convert_syllable_cached(syllable: str) -> str:
+    # Fallback for capitalised or otherwise unusual syllables.
+    return convert_syllable(syllable)
+
+
 def numbered_pinyin_to_tone_marks(pinyin: str) -> str:
     """Convert numbered pinyin (e.g. 'xue3') to tone marks (e.g. 'xuě').
 
     Supports whitespace-separated syllables and 'u:' for 'ü'.
     """
+    table = syllable_table()
+    return " ".join(table.get(s) or convert_syllable_cached(s) for s in pinyin.split())
+
+
+def numbered_pinyin_to_tone_marks_bulk(values: Iterable[str]) -> List[str]:
+    """Convert many numbered pinyin strings at once, converting each distinct value once."""
+    values = list(values)
+    converted = {value: numbered_pinyin_to_tone_marks(value) for value in dict.fromkeys(values)}
+    return [converted[value] for value in values]
+
+
+def default_workers() -> int:
+    return int(os.environ.get("TIAN_WORKERS") or os.cpu_count() or 1)
+
+
+# Each worker loads hanzipy on its first miss, which costs seconds; fanning
+# out only pays off once there are enough uncached characters to spread.
+PARALLEL_MIN_MISSES = 200
+
+
+def map_levels(func: Callable[[int], T], levels: Iterable[int], workers: Optional[int] = None) -> List[T]:
+    """Apply ``func`` to each level, in a process pool when it can help.
+
+    Results come back in level order. ``func`` must be picklable (a module-level
+    function or a functools.partial of one).
+    """
+    levels = list(levels)
+    workers = default_workers() if workers is None else workers
+    if workers <= 1 or len(levels) <= 1:
+        return [func(level) for level in levels]
+    # Imported here: multiprocessing alone costs more than the rest of this
+    # module, and lookups that never fan out should not pay for it.
+    from concurrent.futures import ProcessPoolExecutor
 
-    def convert_syllable(syllable: str) -> str:
-        if not syllable:
-            return syllable
-
-        syllable = syllable.replace("u:", "ü").replace("U:", "Ü")
-
-        tone = 5
-        if syllable[-1].isdigit():
-            tone = int(syllable[-1])
-            syllable = syllable[:-1]
-
-        if tone in (0, 5):
-            return syllable
-
-        lower = syllable.lower()
-        vowels = "aeiouü"
-        vowel_positions = [i for i, ch in enumerate(lower) if ch in vowels]
-        if not vowel_positions:
-            return syllable
-
-        # Tone placement rules:
-        # - If 'a' or 'e' present, mark the first of those.
-        # - Else if 'ou' present, mark the 'o'.
-        # - Else for 'iu' mark 'u', for 'ui' mark 'i'.
-        # - Else mark the last vowel.
-        mark_index = None
-        for v in ("a", "e"):
-            idx = lower.find(v)
-            if idx != -1:
-                mark_index = idx
-                break
-        if mark_index is None and "ou" in lower:
-            mark_index = lower.find("o")
-        if mark_index is None and "iu" in lower:
-            mark_index = lower.find("u")
-        if mark_index is None and "ui" in lower:
-            mark_index = lower.find("i")
-        if mark_index is None:
-            mark_index = vowel_positions[-1]
-
-        ch = lower[mark_index]
-        marked = TONE_MARKS.get(ch, [ch, ch, ch, ch])[tone - 1]
-        # Preserve original case of the vowel being replaced
-        if syllable[mark_index].isupper():
-            marked = marked.upper()
-
-        return syllable[:mark_index] + marked + syllable[mark_index + 1 :]
-
-    return " ".join(convert_syllable(s) for s in pinyin.split())
+    with ProcessPoolExecutor(max_workers=min(workers, len(levels))) as pool:
+        return list(pool.map(func, levels))
 
 
 def read_entries(path: Path) -> List[str]:
@@ -89,9 +198,70 @@ def read_entries(path: Path) -> List[str]:
 
 
 def write_csv(rows: Iterable[Dict[str, object]], headers: List[str], path: Path) -> None:
-    """Write rows to CSV with the given headers."""
+    """Write rows (dicts or lexicon records) to CSV with the given headers.
+
+    The table is written next to ``path`` and renamed over it, so readers
+    (the lookup server, a watch rebuild) never see a half-written file.
+    """
     path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", newline="", encoding="utf-8") as handle:
-        writer = csv.DictWriter(handle, fieldnames=headers)
-        writer.writeheader()
-        writer.writerows(rows)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with PROFILER.stage(f"write_csv.{path.name}"), tmp_path.open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(headers)
+        for row in rows:
+            if isinstance(row, Record):
+                values = row.values(headers)
+            else:
+                values = [row.get(header, "") for header in headers]
+            writer.writerow(values)
+    os.replace(tmp_path, path)
+
+
+def hanzi_sources(levels: Iterable[int] = LEVELS) -> List[Path]:
+    """Return the HSK hanzi list paths for the given levels."""
+    return [HANZI_DIR / f"HSK_Level_{level}_hanzi.txt" for level in levels]
+
+
+def read_level_entries(path: Path) -> List[str]:
+    """Like read_entries, but a level list that is not present reads as empty."""
+    return read_entries(path) if path.exists() else []
+
+
+def word_sources(levels: Iterable[int] = LEVELS) -> List[Path]:
+    """Return the HSK word list paths for the given levels."""
+    return [WORDS_DIR / f"HSK_Level_{level}_words.txt" for level in levels]
+
+
+MNEMONICS_PATH = OUTPUT_DIR / "mnemonics.json"
+MNEMONIC_COLUMNS = ("meaning_mnemonic", "reading_mnemonic")
+
+
+def load_mnemonics(table: str, path: Path = MNEMONICS_PATH) -> Dict[str, Dict[str, str]]:
+    """Return the stored mnemonics of one table, keyed by character or word.
+
+    generate_mnemonics writes the store; the hanzi and vocabulary stages merge
+    it into their rows, so rebuilding a table keeps its mnemonics.
+    """
+    if not path.exists():
+        return {}
+    with path.open(encoding="utf-8") as handle:
+        entries = json.load(handle).get(table) or {}
+    return {
+        term: {column: str(values.get(column) or "") for column in MNEMONIC_COLUMNS}
+        for term, values in entries.items()
+    }
+
+
+def file_digest(path: Path) -> str:
+    """Return the SHA-256 hex digest of a file's contents ("" if it is missing)."""
+    if not path.exists():
+        return ""
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def tian_levels(rows: Iterable[Dict[str, object]], key: str) -> Dict[str, int]:
+    """Map each row's ``key`` column to its tian_level (rows may be a DataFrame)."""
+    if hasattr(rows, "columns"):
+        keyed = rows[rows[key].astype(bool)]
+        return dict(zip(keyed[key].astype(str), keyed["tian_level"].astype(int)))
+    return {str(row[key]): int(row["tian_level"]) for row in rows if row[key]}
@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+"""
+Long-running local lookup service over the output CSVs.
+
+The radicals, hanzi and vocabulary tables are loaded once into in-memory
+term indexes and served over HTTP as JSON:
+
+    GET  /lookup?term=你好&term=学
+    POST /lookup   {"terms": ["你好", "学"]}
+    POST /analyze  {"sentences": ["我们学习中文。"]}
+    GET  /health
+
+Sentence analysis reuses the corpus analyzer's longest-match segmentation
+and is memoized in an LRU cache. The CSVs are polled (at most once per
+``--reload-interval`` seconds, on request) and the tables are swapped out
+when any of them changes.
+
+    python lookup_server.py --port 8765
+"""
+
+import argparse
+import csv
+import json
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from analyze_corpus import build_trie, load_vocab_levels, longest_matches
+from build_hsk_vocab_csv import normalize_vocab_key
+from hsk_csv_utils import HANZI_CSV_PATH, RADICALS_CSV_PATH, VOCAB_CSV_PATH
+
+# (path, key column, kind), in lookup precedence order.
+TABLES: List[Tuple[Path, str, str]] = [
+    (VOCAB_CSV_PATH, "vocab", "word"),
+    (HANZI_CSV_PATH, "hanzi", "hanzi"),
+    (RADICALS_CSV_PATH, "radical", "radical"),
+]
+ENTRY_FIELDS = ("pinyin", "simple_meaning", "meaning", "components")
+MAX_BATCH = 10000
+MAX_BODY_BYTES = 16 << 20
+
+Entry = Dict[str, object]
+
+
+def parse_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value or "")
+    except ValueError:
+        return None
+
+
+def table_entry(row: Dict[str, str], term: str, kind: str) -> Entry:
+    components = (row.get("components") or "").split()
+    return {
+        "term": term,
+        "kind": kind,
+        "tian_level": parse_int(row.get("tian_level")),
+        "hsk_level": parse_int(row.get("hsk_level")),
+        "pinyin": row.get("pinyin") or "",
+        "simple_meaning": row.get("simple_meaning") or "",
+        "meaning": row.get("meaning") or row.get("radical_name") or "",
+        "components": components,
+    }
+
+
+class LookupTables:
+    """One loaded generation of the tables plus its sentence cache."""
+
+    def __init__(self, cache_size: int = 4096) -> None:
+        self.mtimes = source_mtimes()
+        self.entries: Dict[str, Entry] = {}
+        # Taken from every hanzi row: single-character words shadow their
+        # hanzi entry in ``entries``.
+        hanzi_levels: Dict[str, int] = {}
+        for path, column, kind in TABLES:
+            if not path.exists():
+                continue
+            with path.open(encoding="utf-8") as handle:
+                for row in csv.DictReader(handle):
+                    term = (row.get(column) or "").strip()
+                    if not term:
+                        continue
+                    if kind == "hanzi":
+                        level = parse_int(row.get("tian_level"))
+                        if level is not None:
+                            hanzi_levels[term] = level
+                    keys = [term]
+                    if kind == "word" and normalize_vocab_key(term) != term:
+                        keys.append(normalize_vocab_key(term))
+                    for key in keys:
+                        self.merge(key, table_entry(row, key, kind))
+
+        self.trie = build_trie(load_vocab_levels(VOCAB_CSV_PATH, hanzi_levels))
+        self.analyze = lru_cache(maxsize=cache_size)(self._analyze)
+        self.loaded_at = time.time()
+
+    def merge(self, key: str, entry: Entry) -> None:
+        """Earlier tables win; empty fields are filled from later ones."""
+        existing = self.entries.get(key)
+        if existing is None:
+            self.entries[key] = entry
+            return
+        for field in ("tian_level", "hsk_level", *ENTRY_FIELDS):
+            if existing[field] in (None, "", []):
+                existing[field] = entry[field]
+
+    def lookup(self, term: str) -> Optional[Entry]:
+        return self.entries.get(term) or self.entries.get(normalize_vocab_key(term))
+
+    def _analyze(self, sentence: str) -> Dict[str, object]:
+        segments: List[Entry] = []
+        required = 0
+        unknown: List[str] = []
+        for segment, word_level in longest_matches(self.trie, sentence):
+            entry = self.lookup(segment)
+            level = word_level if word_level is not None else (entry or {}).get("tian_level")
+            if level is None:
+                unknown.append(segment)
+            else:
+                required = max(required, level)  # type: ignore[arg-type]
+            segments.append(entry if entry is not None else {"term": segment, "kind": "unknown"})
+        return {
+            "text": sentence,
+            "required_level": required or None,
+            "segments": segments,
+            "unknown": unknown,
+        }
+
+
+def source_mtimes() -> Tuple[float, ...]:
+    return tuple(path.stat().st_mtime if path.exists() else 0.0 for path, _, _ in TABLES)
+
+
+class LookupService:
+    """Holds the current tables and reloads them when the CSVs change."""
+
+    def __init__(self, cache_size: int = 4096, reload_interval: float = 1.0) -> None:
+        self.cache_size = cache_size
+        self.reload_interval = reload_interval
+        self.tables = LookupTables(cache_size)
+        self._checked_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def current(self) -> LookupTables:
+        now = time.monotonic()
+        if now - self._checked_at >= self.reload_interval:
+            with self._lock:
+                if now - self._checked_at >= self.reload_interval:
+                    self._checked_at = now
+                    if source_mtimes() != self.tables.mtimes:
+                        # Requests in flight keep using the old generation.
+                        self.tables = LookupTables(self.cache_size)
+        return self.tables
+
+    def lookup(self, terms: List[str]) -> Dict[str, object]:
+        tables = self.current()
+        return {"results": {term: tables.lookup(term) for term in terms}}
+
+    def analyze(self, sentences: List[str]) -> Dict[str, object]:
+        tables = self.current()
+        return {"results": [tables.analyze(sentence) for sentence in sentences]}
+
+    def health(self) -> Dict[str, object]:
+        tables = self.current()
+        info = tables.analyze.cache_info()
+        return {
+            "terms": len(tables.entries),
+            "loaded_at": tables.loaded_at,
+            "analyze_cache": {"hits": info.hits, "misses": info.misses, "size": info.currsize},
+        }
+
+
+class LookupHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so clients can reuse connections
+    # Headers and body are separate writes; without TCP_NODELAY every
+    # keep-alive response stalls on the client's delayed ACK.
+    disable_nagle_algorithm = True
+    service: LookupService
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+    def send_json(self, payload: object, status: int = 200) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        if url.path == "/lookup":
+            terms = parse_qs(url.query).get("term", [])
+            self.send_json(self.service.lookup(terms[:MAX_BATCH]))
+        elif url.path == "/health":
+            self.send_json(self.service.health())
+        else:
+            self.send_json({"error": f"unknown path {url.path}"}, 404)
+
+    def do_POST(self) -> None:
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length < 0:
+                raise ValueError(length)
+        except ValueError:
+            # The body cannot be skipped without a length, so drop the connection after replying.
+            self.close_connection = True
+            self.send_json({"error": "invalid Content-Length"}, 400)
+            return
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            self.send_json({"error": f"body larger than {MAX_BODY_BYTES} bytes"}, 413)
+            return
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self.send_json({"error": "body is not valid JSON"}, 400)
+            return
+        if not isinstance(payload, dict):
+            self.send_json({"error": "body must be a JSON object"}, 400)
+            return
+        path = urlsplit(self.path).path
+        if path == "/lookup":
+            items, handler = payload.get("terms"), self.service.lookup
+        elif path == "/analyze":
+            items, handler = payload.get("sentences"), self.service.analyze
+        else:
+            self.send_json({"error": f"unknown path {path}"}, 404)
+            return
+        if not isinstance(items, list) or not all(isinstance(item, str) for item in items):
+            self.send_json({"error": "expected a JSON list of strings"}, 400)
+        elif len(items) > MAX_BATCH:
+            self.send_json({"error": f"at most {MAX_BATCH} items per request"}, 413)
+        else:
+            self.send_json(handler(items))
+
+
+def make_server(
+    host: str = "127.0.0.1", port: int = 8765, cache_size: int = 4096, reload_interval: float = 1.0
+) -> ThreadingHTTPServer:
+    handler = type("BoundLookupHandler", (LookupHandler,), {"service": LookupService(cache_size, reload_interval)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve TIAN lookups over local HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--cache-size", type=int, default=4096, help="Sentences kept in the analysis LRU.")
+    parser.add_argument("--reload-interval", type=float, default=1.0, help="Seconds between CSV change checks.")
+    args = parser.parse_args()
+    server = make_server(args.host, args.port, args.cache_size, args.reload_interval)
+    print(f"Serving {len(server.RequestHandlerClass.service.tables.entries)} terms on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+"""
+Keyed row hashes and a changelog of what each table rewrite changed.
+
+Whenever a build (run_pipeline, watch mode or a stage script) rewrites an
+output table, it calls record_table: the table's rows are keyed (radical;
+hanzi or vocab plus hsk_level; a copy number for repeated entries) and
+hashed, and compared with the hashes kept from the previous write in
+.cache/row_hashes.json. Tables that differ get one
+JSON line appended to output/changelog_levels_<a>_<b>.jsonl:
+
+    {"table": "hanzi", "built_at": "...", "from": "<digest>", "to": "<digest>",
+     "added": [{row}], "removed": [{key}],
+     "changed": [{"key": {key}, "fields": {"tian_level": ["3", "4"]}}]}
+
+Row order plays no part, so a re-sort alone logs nothing. ``from``/``to``
+are whole-table digests: a consumer holding the ``from`` version of a table
+can apply the entry instead of reloading it. The first write of a table
+only records its baseline.
+"""
+
+import csv
+import hashlib
+import json
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from build_profile import PROFILER
+from hanzipy_cache import read_json, write_json
+from hsk_csv_utils import CACHE_DIR, OUTPUT_DIR, output_path
+
+ROW_HASHES_PATH = CACHE_DIR / "row_hashes.json"
+# A character or word can sit in several HSK lists, so hsk_level is part of the key.
+KEY_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "radicals": ("radical",),
+    "hanzi": ("hanzi", "hsk_level"),
+    "vocabulary": ("vocab", "hsk_level"),
+}
+
+# row key -> (row hash, values in header order)
+HashedRows = Dict[str, Tuple[str, List[str]]]
+
+
+def changelog_path(levels: List[int]) -> Path:
+    return OUTPUT_DIR / f"changelog_levels_{min(levels)}_{max(levels)}.jsonl"
+
+
+def row_hash(values: Sequence[str]) -> str:
+    return hashlib.blake2b("\x1f".join(values).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def table_digest(rows: HashedRows) -> str:
+    """Order-independent digest of a whole table."""
+    hashes = sorted(f"{key}\x1e{row[0]}" for key, row in rows.items())
+    return hashlib.sha256("\n".join(hashes).encode("utf-8")).hexdigest()
+
+
+def hash_rows(headers: List[str], rows: Iterable[Sequence[object]], key_columns: Sequence[str]) -> HashedRows:
+    """Rows by key; a list can repeat an entry, so later copies get "#2", "#3", ... appended."""
+    key_index = [headers.index(column) for column in key_columns]
+    hashed: HashedRows = {}
+    copies: Counter = Counter()
+    for row in rows:
+        values = ["" if value is None else str(value) for value in row]
+        key = "\t".join(values[i] for i in key_index)
+        copies[key] += 1
+        if copies[key] > 1:
+            key = f"{key}\t#{copies[key]}"
+        hashed[key] = (row_hash(values), values)
+    return hashed
+
+
+def diff_rows(
+    old_headers: List[str],
+    old: HashedRows,
+    headers: List[str],
+    new: HashedRows,
+    key_columns: Sequence[str],
+) -> Dict[str, List[Dict[str, object]]]:
+    """Added rows, removed keys and per-field deltas of changed rows."""
+
+    def key_fields(key: str) -> Dict[str, object]:
+        parts = key.split("\t")
+        fields: Dict[str, object] = dict(zip(key_columns, parts))
+        if len(parts) > len(key_columns):
+            fields["copy"] = int(parts[-1][1:])
+        return fields
+
+    added = [dict(zip(headers, new[key][1])) for key in new if key not in old]
+    removed = [key_fields(key) for key in old if key not in new]
+    changed: List[Dict[str, object]] = []
+    for key, (digest, values) in new.items():
+        previous = old.get(key)
+        if previous is None or (previous[0] == digest and old_headers == headers):
+            continue
+        before = dict(zip(old_headers, previous[1]))
+        fields = {
+            header: [before.get(header), value]
+            for header, value in zip(headers, values)
+            if before.get(header) != value
+        }
+        fields.update({header: [value, None] for header, value in before.items() if header not in headers})
+        if fields:
+            changed.append({"key": key_fields(key), "fields": fields})
+    return {"added": added, "removed": removed, "changed": changed}
+
+
+def record_table(
+    table: str,
+    levels: List[int],
+    state_path: Path = ROW_HASHES_PATH,
+) -> Optional[Dict[str, object]]:
+    """Hash the ``table`` ("radicals", "hanzi" or "vocabulary") a build just wrote.
+
+    The CSV is read back, so record and DataFrame builds log the same cells.
+    Returns the changelog entry, or None for baselines and rewrites that
+    changed nothing.
+    """
+    path = output_path(table, levels)
+    key_columns = KEY_COLUMNS[table]
+    with PROFILER.stage(f"changelog.{path.name}"), path.open(newline="", encoding="utf-8") as handle:
+        reader = csv.reader(handle)
+        headers = next(reader, [])
+        hashed = hash_rows(headers, reader, key_columns)
+    digest = table_digest(hashed)
+    state = read_json(state_path) or {}
+    previous = state.get(path.name)
+    state[path.name] = {"digest": digest, "headers": headers, "rows": hashed}
+    write_json(state, state_path)
+    if not isinstance(previous, dict) or previous.get("digest") == digest:
+        return None
+
+    old_rows: HashedRows = {key: (row[0], row[1]) for key, row in (previous.get("rows") or {}).items()}
+    delta = diff_rows(list(previous.get("headers") or []), old_rows, headers, hashed, key_columns)
+    if not any(delta.values()):
+        return None
+    entry: Dict[str, object] = {
+        "table": table,
+        "built_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "from": previous.get("digest"),
+        "to": digest,
+        **delta,
+    }
+    log_path = changelog_path(levels)
+    with log_path.open("a", encoding="utf-8") as handle:
+        handle.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    return entry
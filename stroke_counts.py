@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+"""
+Stroke counts from the ``strokes`` package, memoized on disk.
+
+Importing strokes parses its whole character table, so counts are looked up
+in one batch per stage and kept in .cache/stroke_counts.json, keyed by the
+package version. A warm build never imports strokes.
+
+hanzipy decomposes into single strokes (CJK Strokes block) and radical forms
+the package does not list; Kangxi radicals are looked up as the character
+NFKC maps them to, supplement forms come from RADICAL_FORM_STROKES. Anything
+still unknown has no count (an empty cell) and sorts after the known ones.
+"""
+
+import importlib
+import unicodedata
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from build_profile import PROFILER
+from hanzipy_cache import read_json, write_json
+from hsk_csv_utils import CACHE_DIR, file_digest
+
+STROKE_CACHE_PATH = CACHE_DIR / "stroke_counts.json"
+
+# U+31C0-U+31EF: each CJK Strokes character is one stroke.
+CJK_STROKES = range(0x31C0, 0x31F0)
+
+# CJK Radicals Supplement forms, which NFKC leaves alone (bar a few such as
+# ⺟), counted as written in a character.
+RADICAL_FORM_STROKES: Dict[str, int] = {
+    "⺀": 2,  # 冫-like dots
+    "⺁": 2,  # 厂
+    "⺂": 1,  # 乛
+    "⺃": 1,  # 乚
+    "⺅": 2,  # 亻
+    "⺇": 2,  # 几
+    "⺈": 2,  # 刀 on top, as in 色
+    "⺉": 2,  # 刂
+    "⺊": 2,  # 卜
+    "⺌": 3,  # 小 on top, as in 当
+    "⺍": 3,  # 小 on top, as in 学
+    "⺕": 3,  # 彐
+    "⺖": 3,  # 忄
+    "⺘": 3,  # 扌
+    "⺙": 4,  # 攵
+    "⺡": 3,  # 氵
+    "⺣": 4,  # 灬
+    "⺤": 4,  # 爫
+    "⺦": 3,  # 丬
+    "⺧": 4,  # 牛 on top, as in 告
+    "⺨": 3,  # 犭
+    "⺩": 4,  # 王
+    "⺫": 5,  # 罒
+    "⺭": 4,  # 礻
+    "⺮": 6,  # 竹
+    "⺺": 4,  # 肀
+    "⺾": 3,  # 艹
+    "⻊": 7,  # 足
+    "⻌": 3,  # 辶
+    "⻏": 2,  # 阝 on the right
+    "⻖": 2,  # 阝 on the left
+    "⻗": 8,  # 雨
+    "⻠": 3,  # 饣
+    "⻉": 4,  # 贝
+    "⻋": 4,  # 车
+    "⻓": 4,  # 长
+    "⻔": 3,  # 门
+    "⻚": 6,  # 页
+    "⻛": 4,  # 风
+    "⻜": 3,  # 飞
+    "⻢": 3,  # 马
+    "⻥": 8,  # 鱼
+    "⻦": 5,  # 鸟
+    "⻨": 7,  # 麦
+    "⻩": 11,  # 黄
+    "⻬": 6,  # 齐
+    "⻮": 8,  # 齿
+    "⻰": 5,  # 龙
+}
+
+
+def load_strokes():
+    try:
+        return importlib.import_module("strokes").strokes
+    except Exception as exc:  # pragma: no cover
+        raise SystemExit(
+            "strokes is required but not available. "
+            "Install dependencies in the project venv: "
+            "./venv/Scripts/python.exe -m pip install -r requirements.txt\n"
+            f"Original error: {exc}"
+        )
+
+
+@lru_cache(maxsize=None)
+def strokes_version() -> str:
+    try:
+        from importlib.metadata import version
+
+        return version("strokes")
+    except Exception:
+        return "unknown"
+
+
+def known_strokes(character: str) -> Tuple[Optional[int], str]:
+    """The count of a single stroke or radical form, else None and the form to look up."""
+    if len(character) == 1 and ord(character) in CJK_STROKES:
+        return 1, character
+    if character in RADICAL_FORM_STROKES:
+        return RADICAL_FORM_STROKES[character], character
+    return None, unicodedata.normalize("NFKC", character)
+
+
+def stroke_sort_key(count: Optional[int]) -> Tuple[bool, int]:
+    """Orders known stroke counts ascending, unknown ones last."""
+    return count is None, count or 0
+
+
+class StrokeTable:
+    """Character -> stroke count (None if unknown), filled in batches from the strokes package."""
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = STROKE_CACHE_PATH if path is None else path
+        # The forms above decide counts too, so this module's source keys the cache.
+        self.key = {"strokes": strokes_version(), "rules": file_digest(Path(__file__))}
+        self._counts: Dict[str, Optional[int]] = {}
+        self._dirty = False
+
+        cached = read_json(self.path)
+        if cached and cached.get("key") == self.key:
+            self._counts = dict(cached.get("counts") or {})
+
+    def counts(self, characters: Iterable[str]) -> Dict[str, Optional[int]]:
+        """Stroke counts for a whole character set, missing ones fetched in one call."""
+        wanted = list(dict.fromkeys(characters))
+        missing = [ch for ch in wanted if ch not in self._counts]
+        PROFILER.hit("stroke_cache", not missing)
+        if missing:
+            lookups: Dict[str, str] = {}
+            for ch in missing:
+                self._counts[ch], form = known_strokes(ch)
+                # strokes() takes a string of single characters; anything
+                # longer (e.g. a multi-codepoint component) has no count.
+                if self._counts[ch] is None and len(form) == 1:
+                    lookups[ch] = form
+            with PROFILER.stage("strokes.lookup"):
+                found = load_strokes()("".join(lookups.values())) if lookups else []
+            if len(lookups) == 1:
+                found = [found]
+            # strokes reports characters it does not know as 0.
+            self._counts.update(zip(lookups, (int(count) if count else None for count in found)))
+            self._dirty = True
+        return {ch: self._counts[ch] for ch in wanted}
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        write_json({"key": self.key, "counts": self._counts}, self.path)
+        self._dirty = False
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+"""
+Sweep the radical leveling parameters without rerunning the pipeline.
+
+Decompositions are loaded once (from the decomposition cache when warm) and
+every (target_per_level, weights, max_level) combination is evaluated in a
+process pool. For each configuration the hanzi are re-levelled the way the
+hanzi stage does it and summarised: hanzi per tian level, its spread, empty
+levels, and the level by which each HSK level is fully unlocked.
+
+    python sweep_radical_levels.py --targets 10,15,20 --weights 5/3/1,1/1/1 --max-levels 40,60 --top 10
+"""
+
+import argparse
+import itertools
+import json
+import statistics
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from build_hsk_hanzi_csv import tian_level_from_components
+from build_radicals_csv import (
+    LEVEL_WEIGHTS,
+    MAX_TIAN_LEVEL,
+    TARGET_PER_LEVEL,
+    assign_tian_levels,
+    collect_level_components,
+    create_decomposer,
+)
+from hsk_csv_utils import LEVELS, default_workers, parse_levels
+
+PerLevel = List[List[Tuple[str, List[str]]]]
+# (target_per_level, weights by HSK level, max_level)
+Config = Tuple[int, Dict[int, int], int]
+
+# Numeric result fields a sweep can be ranked by.
+SORT_METRICS = (
+    "hanzi_per_level_variance",
+    "hanzi_per_level_max",
+    "hanzi_per_level_mean",
+    "empty_levels",
+    "levels_used",
+    "hanzi",
+    "target_per_level",
+    "max_level",
+)
+
+_PER_LEVEL: PerLevel = []
+_LEVELS: List[int] = []
+
+
+def parse_weights(spec: str, levels: List[int]) -> Dict[int, int]:
+    """Map e.g. ``5/3/1`` to {1: 5, 2: 3, 3: 1}; levels not listed weigh 1."""
+    return {level: int(weight) for level, weight in zip(levels, spec.split("/"))}
+
+
+def format_weights(weights: Dict[int, int]) -> str:
+    return "/".join(str(weights[level]) for level in sorted(weights))
+
+
+def evaluate(config: Config, per_level: PerLevel, levels: List[int]) -> Dict[str, object]:
+    """Summary metrics for one configuration."""
+    target, weights, max_level = config
+    _, _, radical_levels = assign_tian_levels(per_level, levels, target, weights, max_level)
+
+    per_tian: Counter = Counter()
+    unlocked_by: Dict[int, int] = {}
+    for level, entries in zip(levels, per_level):
+        for _, components in entries:
+            tian = tian_level_from_components(components, radical_levels, level)
+            per_tian[tian] += 1
+            unlocked_by[level] = max(unlocked_by.get(level, 0), tian)
+
+    top = max(per_tian) if per_tian else 0
+    counts = [per_tian.get(level, 0) for level in range(1, top + 1)]
+    return {
+        "target_per_level": target,
+        "weights": format_weights(weights),
+        "max_level": max_level,
+        "hanzi": sum(counts),
+        "levels_used": sum(1 for c in counts if c),
+        "empty_levels": sum(1 for c in counts if not c),
+        "hanzi_per_level_mean": round(statistics.fmean(counts), 3) if counts else 0.0,
+        "hanzi_per_level_variance": round(statistics.pvariance(counts), 3) if counts else 0.0,
+        "hanzi_per_level_max": max(counts) if counts else 0,
+        "hsk_unlocked_at": {str(level): unlocked_by[level] for level in sorted(unlocked_by)},
+        "hanzi_per_level": counts,
+    }
+
+
+def init_worker(per_level: PerLevel, levels: List[int]) -> None:
+    global _PER_LEVEL, _LEVELS
+    _PER_LEVEL, _LEVELS = per_level, levels
+
+
+def evaluate_in_worker(config: Config) -> Dict[str, object]:
+    return evaluate(config, _PER_LEVEL, _LEVELS)
+
+
+def sweep(
+    configs: List[Config],
+    levels: List[int] = LEVELS,
+    workers: Optional[int] = None,
+    per_level: Optional[PerLevel] = None,
+) -> List[Dict[str, object]]:
+    """Evaluate every configuration; decompositions are loaded once and shared."""
+    if per_level is None:
+        decomposer = create_decomposer()
+        per_level = collect_level_components(decomposer, levels, workers)
+        decomposer.save()
+    workers = default_workers() if workers is None else workers
+    if workers <= 1 or len(configs) <= 1:
+        return [evaluate(config, per_level, levels) for config in configs]
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(configs)), initializer=init_worker, initargs=(per_level, levels)
+    ) as pool:
+        return list(pool.map(evaluate_in_worker, configs, chunksize=max(1, len(configs) // (4 * workers))))
+
+
+def main() -> None:
+    default_weights = format_weights(LEVEL_WEIGHTS)
+    parser = argparse.ArgumentParser(description="Sweep the radical leveling parameters.")
+    parser.add_argument("--targets", default=f"10,12,{TARGET_PER_LEVEL},18,20,25", help="Comma-separated target_per_level values.")
+    parser.add_argument("--weights", default=f"{default_weights},3/2/1,9/3/1,1/1/1", help="Comma-separated HSK weight sets, e.g. 5/3/1.")
+    parser.add_argument("--max-levels", default=f"30,40,50,{MAX_TIAN_LEVEL},80", help="Comma-separated tian level caps.")
+    parser.add_argument("--levels", type=parse_levels, default=LEVELS, help="HSK levels to load, e.g. 1-3 or 1-9.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+    parser.add_argument("--sort", choices=SORT_METRICS, default=SORT_METRICS[0], help="Metric to rank configurations by.")
+    parser.add_argument("--top", type=int, default=20, help="How many configurations to print.")
+    parser.add_argument("--json", type=Path, default=None, help="Write every result to this JSON file.")
+    args = parser.parse_args()
+
+    configs: List[Config] = [
+        (int(target), parse_weights(weights, args.levels), int(max_level))
+        for target, weights, max_level in itertools.product(
+            args.targets.split(","), args.weights.split(","), args.max_levels.split(",")
+        )
+    ]
+    results = sweep(configs, args.levels, args.workers)
+    results.sort(key=lambda r: (r[args.sort], r["target_per_level"], r["max_level"], r["weights"]))
+
+    if args.json:
+        args.json.write_text(json.dumps(results, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    print(f"{len(results)} configurations, ranked by {args.sort}:")
+    print(f"{'target':>6} {'weights':>9} {'max':>4} {'used':>5} {'empty':>5} {'mean':>7} {'var':>9} {'peak':>5}  unlocked")
+    for r in results[: args.top]:
+        print(
+            f"{r['target_per_level']:>6} {r['weights']:>9} {r['max_level']:>4} {r['levels_used']:>5} "
+            f"{r['empty_levels']:>5} {r['hanzi_per_level_mean']:>7} {r['hanzi_per_level_variance']:>9} "
+            f"{r['hanzi_per_level_max']:>5}  {r['hsk_unlocked_at']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
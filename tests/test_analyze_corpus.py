@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+"""
+Chunked segmentation in analyze_corpus matches segmenting the whole text at once.
+"""
+
+from pathlib import Path
+
+import analyze_corpus
+from analyze_corpus import Analyzer, analyze_range, build_trie
+
+HANZI_LEVELS = {"中": 1, "国": 1, "人": 1, "很": 2, "好": 1, "学": 2, "生": 2}
+WORDS = {"中国": 1, "中国人": 2, "学生": 3, "你好": 1}
+TEXT = "中国人很好。学生们说：你好！龘龘中国"
+
+
+def feed_chunks(analyzer: Analyzer, text: str, size: int) -> Analyzer:
+    for start in range(0, len(text), size):
+        analyzer.feed(text[start : start + size], final=False)
+    analyzer.feed("")
+    return analyzer
+
+
+def whole(trie) -> Analyzer:
+    analyzer = Analyzer(trie, HANZI_LEVELS)
+    analyzer.feed(TEXT)
+    return analyzer
+
+
+def test_empty_trie_falls_back_to_hanzi_levels() -> None:
+    expected = whole({})
+    for size in (1, 2, 5):
+        analyzer = feed_chunks(Analyzer({}, HANZI_LEVELS), TEXT, size)
+        assert analyzer.max_word_len == 0
+        assert analyzer.state() == expected.state()
+    assert expected.fallback_chars == 10
+    assert expected.unknown["龘"] == 2
+    assert expected.unknown_words["龘龘中国"] == 1
+
+
+def test_word_split_across_chunks() -> None:
+    trie = build_trie(WORDS)
+    expected = whole(trie)
+    assert expected.matched_words == {2: 1, 3: 1, 1: 2}
+    # Every split point, including one inside 中国人 and one inside 学生.
+    for size in range(1, len(TEXT) + 1):
+        assert feed_chunks(Analyzer(trie, HANZI_LEVELS), TEXT, size).state() == expected.state(), size
+
+
+def test_byte_reads_split_characters(tmp_path: Path, monkeypatch) -> None:
+    path = tmp_path / "corpus.txt"
+    path.write_text(TEXT, encoding="utf-8")
+    trie = build_trie(WORDS)
+    # 4-byte reads cut most three-byte hanzi in two.
+    monkeypatch.setattr(analyze_corpus, "READ_SIZE", 4)
+    state = analyze_range(path, 0, path.stat().st_size, Analyzer(trie, HANZI_LEVELS))
+    assert state == whole(trie).state()
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+"""
+ComponentGraph: levels for components the radical table lacks.
+"""
+
+from pathlib import Path
+from typing import Dict, List
+
+from build_hsk_hanzi_csv import tian_level_from_components
+from component_graph import ComponentGraph, load_component_graph
+
+
+class FakeDecomposer:
+    key = {"hanzipy": "test"}
+
+    def __init__(self, once: Dict[str, List[str]]) -> None:
+        self.once = once
+        self.calls: List[str] = []
+
+    def decompose(self, hanzi: str, decomposition_type=None):
+        self.calls.append(hanzi)
+        return {"character": hanzi, "components": self.once.get(hanzi, [])}
+
+
+RADICAL_LEVELS = {"口": 1, "木": 2, "日": 3, "月": 5}
+ONCE = {
+    "林": ["木", "木"],
+    "明": ["日", "月"],
+    "朋": ["月", "月"],
+    # Not in the radical table, and only resolvable through its parts.
+    "㗊": ["品", "口"],
+    "品": ["口", "口", "口"],
+    # A cycle in the data is broken rather than looping.
+    "甲": ["乙"],
+    "乙": ["甲"],
+}
+
+
+def test_known_components_are_not_walked() -> None:
+    decomposer = FakeDecomposer(ONCE)
+    graph = ComponentGraph.build(["口", "木", "月"], decomposer, known=RADICAL_LEVELS)
+    assert decomposer.calls == []
+    assert graph.resolve_levels(RADICAL_LEVELS) == RADICAL_LEVELS
+
+
+def test_unlisted_components_take_their_parts_level() -> None:
+    decomposer = FakeDecomposer(ONCE)
+    graph = ComponentGraph.build(["林", "明", "㗊", "甲"], decomposer, known=RADICAL_LEVELS)
+    levels = graph.resolve_levels(RADICAL_LEVELS)
+    assert levels["林"] == 2
+    assert levels["明"] == 5
+    assert levels["品"] == 1 and levels["㗊"] == 1
+    assert "甲" not in levels and "乙" not in levels
+    assert graph.broken_edges == 1
+    # A hanzi made of 明 and 口 gets 明's resolved level instead of falling back.
+    assert tian_level_from_components(["明", "口"], levels, 9) == 5
+    assert tian_level_from_components(["明", "口"], RADICAL_LEVELS, 9) == 1
+
+
+def test_cached_edges_skip_decomposition(tmp_path: Path) -> None:
+    path = tmp_path / "graph.json"
+    first = FakeDecomposer(ONCE)
+    load_component_graph(["㗊", "明"], first, RADICAL_LEVELS, path)
+    assert sorted(first.calls) == ["㗊", "品", "明"]
+    second = FakeDecomposer(ONCE)
+    graph = load_component_graph(["㗊", "明"], second, RADICAL_LEVELS, path)
+    assert second.calls == []
+    assert graph.resolve_levels(RADICAL_LEVELS)["㗊"] == 1
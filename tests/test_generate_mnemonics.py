@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+"""
+generate_mnemonics against a fake OpenAI-compatible server (via ``base_url``).
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+import pytest
+
+pytest.importorskip("openai")
+
+import generate_mnemonics  # noqa: E402
+from build_hsk_hanzi_csv import hanzi_row  # noqa: E402
+from hsk_csv_utils import load_mnemonics  # noqa: E402
+
+
+class FakeOpenAI(BaseHTTPRequestHandler):
+    """Answers /v1/chat/completions; the very first request fails with a 500."""
+
+    requests: List[Dict[str, object]] = []
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        type(self).requests.append(body)
+        if self.path != "/v1/chat/completions" or len(type(self).requests) == 1:
+            self.send_error(500)
+            return
+        term = body["messages"][1]["content"].splitlines()[0].split(": ", 1)[1]
+        content = json.dumps({"meaning_mnemonic": f"meaning of {term}", "reading_mnemonic": f"reading of {term}"})
+        payload = json.dumps(
+            {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": 0,
+                "model": body["model"],
+                "choices": [
+                    {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+                ],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+            }
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def fake_server():
+    FakeOpenAI.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAI)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def paths(tmp_path, monkeypatch):
+    table = tmp_path / "hanzi.csv"
+    table.write_text(
+        "hanzi,tian_level,hsk_level,pinyin,meaning,meaning_mnemonic,reading_mnemonic,components\n"
+        "一,1,1,yī,one,,,一\n"
+        "二,1,1,èr,two,,,二\n",
+        encoding="utf-8",
+    )
+    store = tmp_path / "mnemonics.json"
+    store.write_text(json.dumps({"hanzi": {"二": {"meaning_mnemonic": "kept", "reading_mnemonic": "kept"}}}))
+    monkeypatch.setattr(generate_mnemonics, "output_path", lambda name, levels: tmp_path / f"{name}.csv")
+    monkeypatch.setattr(generate_mnemonics, "CACHE_PATH", tmp_path / "cache.jsonl")
+    monkeypatch.setattr(generate_mnemonics, "MNEMONICS_PATH", store)
+    return store
+
+
+def run(base_url: str) -> None:
+    generate_mnemonics.generate_mnemonics(["hanzi"], model="fake-model", base_url=base_url, backoff=0, build=False)
+
+
+def test_fills_store_through_base_url(fake_server, paths):
+    run(fake_server)
+
+    # One failed attempt, retried; the stored entry for 二 is not requested again.
+    assert len(FakeOpenAI.requests) == 2
+    assert all(request["model"] == "fake-model" for request in FakeOpenAI.requests)
+    assert load_mnemonics("hanzi", paths) == {
+        "一": {"meaning_mnemonic": "meaning of 一", "reading_mnemonic": "reading of 一"},
+        "二": {"meaning_mnemonic": "kept", "reading_mnemonic": "kept"},
+    }
+    # The CSV itself is left to the build.
+    assert ",,," in paths.with_name("hanzi.csv").read_text(encoding="utf-8")
+
+    run(fake_server)
+    assert len(FakeOpenAI.requests) == 2
+
+
+def test_prompt_cache_survives_a_lost_store(fake_server, paths):
+    run(fake_server)
+    paths.unlink()
+
+    run(fake_server)
+    assert len(FakeOpenAI.requests) == 3  # only 二, whose mnemonic came from the old store
+    assert load_mnemonics("hanzi", paths)["一"]["meaning_mnemonic"] == "meaning of 一"
+
+
+def test_rows_merge_stored_mnemonics():
+    mnemonics = {"一": {"meaning_mnemonic": "m", "reading_mnemonic": "r"}}
+    row = hanzi_row(("一", ["yi1"], ["一"]), 1, {"一": 1}, {"一": 1}, mnemonics)
+    assert (row.meaning_mnemonic, row.reading_mnemonic) == ("m", "r")
+    assert hanzi_row(("二", ["er4"], ["二"]), 1, {}, {}, mnemonics).meaning_mnemonic == ""
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+"""
+The hanzipy snapshot is only reused by the Python and marshal format that wrote it.
+"""
+
+import hanzipy_cache
+
+
+def test_snapshot_from_another_python_reads_empty(tmp_path, monkeypatch) -> None:
+    path = tmp_path / "hanzipy.snapshot"
+    hanzipy_cache.update_snapshot({"pinyins": {"一": ["yi1"]}}, path)
+    assert hanzipy_cache.read_snapshot(path)["pinyins"] == {"一": ["yi1"]}
+
+    monkeypatch.setattr(hanzipy_cache, "runtime_key", lambda: {"python": "2.7", "marshal": "2"})
+    hanzipy_cache._SNAPSHOTS.clear()
+    assert hanzipy_cache.read_snapshot(path)["pinyins"] == {}
+
+
+def test_decomposer_key_includes_runtime(tmp_path) -> None:
+    decomposer = hanzipy_cache.CachedDecomposer(object, tmp_path / "hanzipy.snapshot")
+    assert decomposer.key["python"] == hanzipy_cache.runtime_key()["python"]
+    assert decomposer.key["marshal"] == hanzipy_cache.runtime_key()["marshal"]
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+"""
+Request validation in lookup_server, against the committed output CSVs.
+"""
+
+import http.client
+import json
+import threading
+from typing import Dict, Iterator, Optional, Tuple
+
+import pytest
+
+import lookup_server
+from lookup_server import MAX_BATCH, make_server
+
+
+@pytest.fixture(scope="module")
+def port() -> Iterator[int]:
+    server = make_server(port=0, reload_interval=3600)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+def post(port: int, path: str, body: bytes, headers: Optional[Dict[str, str]] = None) -> Tuple[int, object]:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.putrequest("POST", path)
+    for name, value in (headers or {"Content-Length": str(len(body))}).items():
+        conn.putheader(name, value)
+    conn.endheaders()
+    conn.send(body)
+    response = conn.getresponse()
+    status, payload = response.status, json.loads(response.read())
+    conn.close()
+    return status, payload
+
+
+def test_lookup(port: int) -> None:
+    status, payload = post(port, "/lookup", json.dumps({"terms": ["一"]}).encode())
+    assert status == 200
+    assert payload["results"]["一"]["tian_level"] == 1
+
+
+@pytest.mark.parametrize(
+    "body",
+    [b"not json", b"[]", '{"terms": "一"}'.encode(), b'{"terms": [1]}'],
+)
+def test_bad_body(port: int, body: bytes) -> None:
+    assert post(port, "/lookup", body)[0] == 400
+
+
+@pytest.mark.parametrize("length", ["abc", "-1", "1.5"])
+def test_bad_content_length(port: int, length: str) -> None:
+    status, payload = post(port, "/lookup", b"{}", {"Content-Length": length})
+    assert status == 400
+    assert payload == {"error": "invalid Content-Length"}
+
+
+def test_too_many_terms(port: int) -> None:
+    body = json.dumps({"terms": ["一"] * (MAX_BATCH + 1)}).encode()
+    assert post(port, "/lookup", body)[0] == 413
+
+
+def test_body_too_large(port: int, monkeypatch) -> None:
+    monkeypatch.setattr(lookup_server, "MAX_BODY_BYTES", 8)
+    assert post(port, "/lookup", json.dumps({"terms": ["一"]}).encode())[0] == 413
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+"""
+The precomputed syllable table against converting each syllable directly.
+"""
+
+from hsk_csv_utils import (
+    PINYIN_FINALS,
+    PINYIN_INITIALS,
+    convert_syllable,
+    numbered_pinyin_to_tone_marks,
+    numbered_pinyin_to_tone_marks_bulk,
+    syllable_table,
+)
+
+GRID = [
+    initial + final + tone
+    for initial in PINYIN_INITIALS
+    for final in PINYIN_FINALS
+    for tone in ("", "1", "2", "3", "4", "5")
+]
+
+
+def test_table_covers_grid() -> None:
+    table = syllable_table()
+    assert all(syllable in table for syllable in GRID)
+
+
+def test_grid_matches_convert_syllable() -> None:
+    for syllable in GRID:
+        assert numbered_pinyin_to_tone_marks(syllable) == convert_syllable(syllable), syllable
+
+
+def test_capitalised_and_u_colon() -> None:
+    variants = [v for s in GRID for v in (s.capitalize(), s.upper(), s.replace("v", "u:"))]
+    for syllable in variants:
+        assert numbered_pinyin_to_tone_marks(syllable) == convert_syllable(syllable), syllable
+    assert numbered_pinyin_to_tone_marks("Zhong1 guo2") == "Zhōng guó"
+    assert numbered_pinyin_to_tone_marks("nu:3 lu:4 xue3") == "nǚ lǜ xuě"
+
+
+def test_bulk_matches_single() -> None:
+    values = ["ni3 hao3", "Bei3 jing1", "nu:3", "ni3 hao3", "r5", ""]
+    assert numbered_pinyin_to_tone_marks_bulk(values) == [numbered_pinyin_to_tone_marks(v) for v in values]
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+"""
+assign_raw_levels (inverted index) against the quadratic scan it replaced.
+"""
+
+import random
+from typing import Dict, List
+
+import pytest
+
+from build_radicals_csv import assign_raw_levels
+
+
+def scan_raw_levels(radical_order: List[str], hanzi_components: Dict[str, List[str]], target_per_level: int):
+    """The previous implementation: rescan every hanzi after each new radical."""
+    introduced: set = set()
+    unlocked: set = set()
+    raw_level_map: Dict[str, int] = {}
+    for radical in radical_order:
+        introduced.add(radical)
+        for hanzi, comps in hanzi_components.items():
+            if hanzi not in unlocked and set(comps).issubset(introduced):
+                unlocked.add(hanzi)
+        raw_level_map[radical] = max(1, (len(unlocked) + target_per_level - 1) // target_per_level)
+    return raw_level_map
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("target_per_level", [1, 3, 10])
+def test_matches_quadratic_scan(seed: int, target_per_level: int) -> None:
+    rng = random.Random(seed)
+    radicals = [chr(0x2F00 + i) for i in range(60)]
+    # Repeated components, and components that never appear in the order.
+    hanzi_components = {
+        chr(0x4E00 + i): [rng.choice(radicals + ["?"]) for _ in range(rng.randint(1, 5))] for i in range(400)
+    }
+    order = rng.sample(radicals, 50)
+    expected = scan_raw_levels(order, hanzi_components, target_per_level)
+    assert assign_raw_levels(order, hanzi_components, target_per_level) == expected
+
+
+def test_warm_cache_skips_pool(tmp_path, monkeypatch) -> None:
+    import build_radicals_csv
+    from hanzipy_cache import CachedDecomposer
+
+    for level, text in ((1, "一\n二\n"), (2, "明\n")):
+        (tmp_path / f"HSK_Level_{level}_hanzi.txt").write_text(text, encoding="utf-8")
+    monkeypatch.setattr(build_radicals_csv, "HANZI_DIR", tmp_path)
+    monkeypatch.setattr(build_radicals_csv, "PARALLEL_MIN_MISSES", 2)
+    pools: List[List[int]] = []
+    monkeypatch.setattr(build_radicals_csv, "map_levels", lambda func, levels, workers: pools.append(levels) or [])
+
+    class Decomposer:
+        def decompose(self, hanzi, decomposition_type=None):
+            return {"components": ["日", "月"] if hanzi == "明" else [hanzi]}
+
+    decomposer = CachedDecomposer(Decomposer, tmp_path / "snapshot")
+    build_radicals_csv.collect_level_components(decomposer, [1, 2], workers=4)
+    assert pools == [[1, 2]]
+
+    pools.clear()
+    decomposer.decompose("一", 2)
+    decomposer.decompose("明", 2)
+    # One miss left: below the threshold, so the levels run in-process.
+    assert build_radicals_csv.collect_level_components(decomposer, [1, 2], workers=4) == [
+        [("一", ["一"]), ("二", ["二"])],
+        [("明", ["日", "月"])],
+    ]
+    assert pools == []
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+"""
+Row keys and deltas in row_changelog, including repeated list entries.
+"""
+
+from row_changelog import KEY_COLUMNS, diff_rows, hash_rows
+
+HEADERS = ["hanzi", "tian_level", "hsk_level", "pinyin"]
+KEYS = KEY_COLUMNS["hanzi"]
+ROWS = [["口", "1", "1", "kǒu"], ["日", "3", "1", "rì"], ["明", "5", "2", "míng"]]
+
+
+def delta(old, new):
+    return diff_rows(HEADERS, hash_rows(HEADERS, old, KEYS), HEADERS, hash_rows(HEADERS, new, KEYS), KEYS)
+
+
+def test_changed_field() -> None:
+    changed = [ROWS[0], ["日", "4", "1", "rì"], ROWS[2]]
+    assert delta(ROWS, changed) == {
+        "added": [],
+        "removed": [],
+        "changed": [{"key": {"hanzi": "日", "hsk_level": "1"}, "fields": {"tian_level": ["3", "4"]}}],
+    }
+
+
+def test_reorder_logs_nothing() -> None:
+    assert not any(delta(ROWS, ROWS[::-1]).values())
+
+
+def test_repeated_entry_is_its_own_row() -> None:
+    repeated = ROWS + [ROWS[0]]
+    assert len(hash_rows(HEADERS, repeated, KEYS)) == 4
+    added = delta(ROWS, repeated)
+    assert added["added"] == [dict(zip(HEADERS, ROWS[0]))]
+    assert not added["removed"] and not added["changed"]
+    removed = delta(repeated, ROWS)
+    assert removed["removed"] == [{"hanzi": "口", "hsk_level": "1", "copy": 2}]
+    assert not removed["added"] and not removed["changed"]
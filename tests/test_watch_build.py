@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+"""
+Watch-mode updates against full rebuilds.
+
+Each case copies the modules into a temporary tree with small HSK lists, an
+Anki export and a fake hanzipy, lets a WatchSession apply one edit, and
+checks the tables it wrote byte for byte against run_pipeline(force=True).
+The run happens in a subprocess so every path (.cache, output, the lists)
+resolves inside the temporary tree.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+from typing import Callable, Dict
+
+import pytest
+
+REPO = Path(__file__).resolve().parents[1]
+
+COMPONENTS = {
+    "明": ["日", "月"],
+    "林": ["木", "木"],
+    "休": ["亻", "木"],
+    "众": ["人", "人", "人"],
+    "品": ["口", "口", "口"],
+    "朋": ["月", "月"],
+    "从": ["人", "人"],
+}
+PINYINS = {
+    "一": ["yi1"], "二": ["er4"], "口": ["kou3"], "人": ["ren2"], "木": ["mu4"], "日": ["ri4"],
+    "月": ["yue4"], "明": ["ming2"], "林": ["lin2"], "休": ["xiu1"], "众": ["zhong4"],
+    "品": ["pin3"], "朋": ["peng2"], "从": ["cong2"],
+}
+HANZI = {1: "一 二 口 人 木 日 月", 2: "明 林 休 众", 3: "品 朋 从"}
+WORDS = {1: "一 二 人 口 人口", 2: "明日 林木 休 明月", 3: "人品 朋 从 众人 众人"}
+
+FAKE_HANZIPY = {
+    "__init__.py": "",
+    "decomposer.py": f'''
+COMPONENTS = {COMPONENTS!r}
+
+
+class HanziDecomposer:
+    def decompose(self, hanzi, decomposition_type=None):
+        return {{"character": hanzi, "components": list(COMPONENTS.get(hanzi, [hanzi]))}}
+
+    def get_radical_meaning(self, radical):
+        return None
+''',
+    "dictionary.py": f'''
+PINYINS = {PINYINS!r}
+
+
+class HanziDictionary:
+    def definition_lookup(self, hanzi):
+        return [{{"pinyin": p, "definition": "meaning of " + hanzi}} for p in PINYINS.get(hanzi, [])]
+
+    def get_pinyin(self, hanzi):
+        return []
+''',
+}
+
+DRIVER = """
+import json
+import sys
+from pathlib import Path
+
+import build_hsk_csv
+import watch_build
+from hsk_csv_utils import output_path
+
+session = watch_build.WatchSession()
+session.update(session.poll())
+for path, text in json.loads(Path(sys.argv[1]).read_text(encoding="utf-8")).items():
+    Path(path).write_text(text, encoding="utf-8")
+changed = session.update(session.poll())
+watched = {table: output_path(table).read_bytes() for table in changed}
+skipped = build_hsk_csv.run_pipeline(workers=1)
+build_hsk_csv.run_pipeline(force=True, workers=1)
+print(json.dumps({
+    "changed": changed,
+    "skipped": [table for table, rows in skipped.items() if rows is None],
+    "matches": [table for table, data in watched.items() if output_path(table).read_bytes() == data],
+}))
+"""
+
+
+def anki_line(word: str, extra: str = "") -> str:
+    numbered = " ".join(PINYINS.get(ch, ["a1"])[0] for ch in word)
+    html = f'<span class="pinYinWrapper">{numbered}</span> <ul><li>{word} meaning{extra}</li></ul>'
+    return "\t".join([word, word, numbered, "", "", "", "", html])
+
+
+def lines(text: str) -> str:
+    return "\n".join(text.split()) + "\n"
+
+
+@pytest.fixture
+def tree(tmp_path: Path) -> Path:
+    for path in REPO.glob("*.py"):
+        shutil.copy(path, tmp_path / path.name)
+    package = tmp_path / "fake" / "hanzipy"
+    package.mkdir(parents=True)
+    for name, source in FAKE_HANZIPY.items():
+        (package / name).write_text(source, encoding="utf-8")
+    data = tmp_path / "references" / "HSK-3.0" / "New HSK (2025)"
+    for folder in ("HSK Hanzi", "HSK Words", "Anki xiehanzi"):
+        (data / folder).mkdir(parents=True)
+    for level in HANZI:
+        (data / "HSK Hanzi" / f"HSK_Level_{level}_hanzi.txt").write_text(lines(HANZI[level]), encoding="utf-8")
+        (data / "HSK Words" / f"HSK_Level_{level}_words.txt").write_text(lines(WORDS[level]), encoding="utf-8")
+        anki = "\n".join(anki_line(word) for word in dict.fromkeys(WORDS[level].split())) + "\n"
+        (data / "Anki xiehanzi" / f"HSK_Level_{level}.txt").write_text(anki, encoding="utf-8")
+    return tmp_path
+
+
+def data_path(tree: Path, folder: str, name: str) -> Path:
+    return tree / "references" / "HSK-3.0" / "New HSK (2025)" / folder / name
+
+
+def run_watch(tree: Path, edits: Dict[Path, str]) -> Dict[str, object]:
+    edits_path = tree / "edits.json"
+    edits_path.write_text(json.dumps({str(p): text for p, text in edits.items()}), encoding="utf-8")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(tree / "fake"), str(tree)]), TIAN_LEVELS="1-3")
+    env.pop("TIAN_VECTORIZED", None)
+    result = subprocess.run(
+        [sys.executable, "-c", DRIVER, str(edits_path)],
+        cwd=tree,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def edit_words(tree: Path) -> Dict[Path, str]:
+    # One word added, one dropped.
+    return {data_path(tree, "HSK Words", "HSK_Level_2_words.txt"): lines("明日 林木 明月 朋从")}
+
+
+def add_duplicate_hanzi(tree: Path) -> Dict[Path, str]:
+    return {data_path(tree, "HSK Hanzi", "HSK_Level_2_hanzi.txt"): lines(HANZI[2] + " 明")}
+
+
+def add_duplicate_word(tree: Path) -> Dict[Path, str]:
+    return {data_path(tree, "HSK Words", "HSK_Level_1_words.txt"): lines(WORDS[1] + " 人口")}
+
+
+def remove_duplicate_word(tree: Path) -> Dict[Path, str]:
+    return {data_path(tree, "HSK Words", "HSK_Level_3_words.txt"): lines("人品 朋 从 众人")}
+
+
+def edit_anki(tree: Path) -> Dict[Path, str]:
+    anki = [anki_line(word, " (edited)" if word == "明月" else "") for word in dict.fromkeys(WORDS[2].split())]
+    return {data_path(tree, "Anki xiehanzi", "HSK_Level_2.txt"): "\n".join(anki) + "\n"}
+
+
+@pytest.mark.parametrize(
+    "edit, tables",
+    [
+        (edit_words, {"vocabulary"}),
+        (add_duplicate_hanzi, {"hanzi"}),
+        (add_duplicate_word, {"vocabulary"}),
+        (remove_duplicate_word, {"vocabulary"}),
+        (edit_anki, {"vocabulary"}),
+    ],
+)
+def test_update_matches_full_build(tree: Path, edit: Callable[[Path], Dict[Path, str]], tables: set) -> None:
+    report = run_watch(tree, edit(tree))
+    changed = {table for table, rows in report["changed"].items() if rows}
+    assert tables <= changed
+    # Watch refreshed the manifest, so a plain rebuild has nothing to do ...
+    assert sorted(report["skipped"]) == ["hanzi", "radicals", "vocabulary"]
+    # ... and the tables it wrote are exactly what a full build produces.
+    assert sorted(report["matches"]) == ["hanzi", "radicals", "vocabulary"]
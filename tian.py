@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+"""
+One command line for the TIAN tools.
+
+    python tian.py build --levels 1-9 --workers 4
+    python tian.py build --watch
+    python tian.py lookup 你好 学
+    python tian.py export anki | python tian.py export sqlite
+    python tian.py analyze corpus.txt --json
+    python tian.py mnemonics --tables hanzi --limit 20
+
+Every subcommand imports its module only when it runs, and ``lookup`` skips
+typer entirely, so a lookup costs little more than interpreter startup plus
+opening the memory-mapped index.
+"""
+
+import sys
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+
+def parse_lookup_args(args: List[str]) -> Optional[Tuple[List[str], Optional[str], bool, Optional[str]]]:
+    """Parse ``lookup`` arguments without typer; None means let typer handle them."""
+    terms: List[str] = []
+    batch: Optional[str] = None
+    compile_index = False
+    levels: Optional[str] = None
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg == "--compile":
+            compile_index = True
+        elif arg == "--batch" and i + 1 < len(args):
+            batch = args[i + 1]
+            i += 1
+        elif arg.startswith("--batch="):
+            batch = arg.split("=", 1)[1]
+        elif arg == "--levels" and i + 1 < len(args):
+            levels = args[i + 1]
+            i += 1
+        elif arg.startswith("--levels="):
+            levels = arg.split("=", 1)[1]
+        elif arg == "--":
+            terms.extend(args[i + 1 :])
+            break
+        elif arg.startswith("-") and arg != "-":
+            return None
+        else:
+            terms.append(arg)
+        i += 1
+    return terms, batch, compile_index, levels
+
+
+def run_lookup_spec(terms: List[str], batch: Optional[str], compile: bool, levels: Optional[str]) -> None:
+    from define_tian_level import run_lookup
+    from hsk_csv_utils import LEVELS, parse_levels
+
+    try:
+        selected = parse_levels(levels) if levels else LEVELS
+    except ValueError as exc:
+        print(f"tian lookup: error: --levels: {exc}", file=sys.stderr)
+        raise SystemExit(2)
+    run_lookup(terms, batch, compile, selected)
+
+
+def build_app():
+    try:
+        import typer
+    except ImportError as exc:  # pragma: no cover
+        raise SystemExit(
+            "typer is required but not available. "
+            "Install dependencies in the project venv: "
+            "./venv/Scripts/python.exe -m pip install -r requirements.txt\n"
+            f"Original error: {exc}"
+        )
+
+    def check_levels(value: Optional[str]) -> Optional[str]:
+        """Reject a bad --levels spec as a usage error, like argparse's type=parse_levels."""
+        from hsk_csv_utils import parse_levels
+
+        if value is not None:
+            try:
+                parse_levels(value)
+            except ValueError as exc:
+                raise typer.BadParameter(str(exc))
+        return value
+
+    app = typer.Typer(help="Build, query and export the TIAN dataset.", no_args_is_help=True, add_completion=False)
+    export_app = typer.Typer(help="Export the output CSVs to other formats.", no_args_is_help=True)
+    app.add_typer(export_app, name="export")
+
+    @app.command()
+    def build(
+        levels: Optional[str] = typer.Option(
+            None, callback=check_levels, help="HSK levels to build, e.g. 1-3 or 1-9 (default: TIAN_LEVELS)."
+        ),
+        force: bool = typer.Option(False, help="Rebuild every stage even if its inputs are unchanged."),
+        no_csv: bool = typer.Option(False, "--no-csv", help="Run all stages without writing CSVs."),
+        workers: Optional[int] = typer.Option(None, help="Worker processes for per-level work (default: CPU count)."),
+        profile: bool = typer.Option(False, help="Write a JSON timing/counter report."),
+        cprofile: bool = typer.Option(False, help="With profiling, also dump a cProfile file per stage."),
+        vectorized: bool = typer.Option(False, help="Use the pandas path for levels, sorting and CSV writing."),
+        watch: bool = typer.Option(False, help="Keep running and rebuild affected rows when inputs change."),
+        interval: float = typer.Option(0.5, help="Seconds between input polls in --watch mode."),
+    ) -> None:
+        """Build the radical, hanzi and vocabulary CSVs."""
+        from build_hsk_csv import run_pipeline
+        from build_profile import configure
+        from hsk_csv_utils import LEVELS, parse_levels
+
+        profiler = configure(profile or cprofile, cprofile)
+        if watch:
+            from watch_build import watch as watch_inputs
+
+            watch_inputs(parse_levels(levels) if levels else LEVELS, interval)
+            return
+        run_pipeline(
+            write=not no_csv,
+            force=force,
+            levels=parse_levels(levels) if levels else LEVELS,
+            workers=workers,
+            vectorized=vectorized or None,
+        )
+        if profiler.enabled:
+            print(f"Profile report written to {profiler.write_report()}")
+
+    @app.command()
+    def lookup(
+        terms: Optional[List[str]] = typer.Argument(None, help="Terms to look up."),
+        batch: Optional[str] = typer.Option(None, metavar="FILE", help="Read one term per line from FILE ('-' for stdin)."),
+        compile: bool = typer.Option(False, "--compile", help="Rebuild the lookup index and exit."),
+        levels: Optional[str] = typer.Option(
+            None, callback=check_levels, help="HSK levels to look up in, e.g. 1-3 or 1-9 (default: TIAN_LEVELS)."
+        ),
+    ) -> None:
+        """Print the Tian level of words, hanzi and radicals."""
+        run_lookup_spec(terms or [], batch, compile, levels)
+
+    @export_app.command("anki")
+    def export_anki(
+        force: bool = typer.Option(False, help="Rewrite every deck, changed or not."),
+        workers: Optional[int] = typer.Option(None, help="Worker processes (default: CPU count)."),
+    ) -> None:
+        """Write one Anki deck per tian_level."""
+        from export_anki_decks import ANKI_OUTPUT_DIR, export_decks
+
+        written = export_decks(force=force, workers=workers)
+        print(f"Wrote {len(written)} deck(s) to {ANKI_OUTPUT_DIR}")
+
+    @export_app.command("sqlite")
+    def export_sqlite_db(
+        output: Optional[Path] = typer.Option(None, help="Database path (default: output/tian_<levels>.sqlite)."),
+    ) -> None:
+        """Write the tables into an indexed SQLite database."""
+        from export_sqlite import export_sqlite
+
+        counts = export_sqlite(path=output)
+        print(", ".join(f"{table}: {count}" for table, count in counts.items()))
+
+    @app.command()
+    def analyze(
+        corpus: Path = typer.Argument(..., help="UTF-8 text file ('-' for stdin)."),
+        target: float = typer.Option(0.98, help="Coverage fraction that counts as readable."),
+        top_unknown: int = typer.Option(50, help="How many unknown characters and words to list."),
+        workers: Optional[int] = typer.Option(None, help="Worker processes (default: CPU count)."),
+        json: bool = typer.Option(False, "--json", help="Print the full report as JSON."),
+    ) -> None:
+        """Report the TIAN level needed to read a Chinese corpus."""
+        from analyze_corpus import run_analysis
+
+        run_analysis(corpus, target, top_unknown, workers, json)
+
+    @app.command()
+    def mnemonics(
+        tables: str = typer.Option("hanzi,vocabulary", help="Comma-separated tables to fill."),
+        model: Optional[str] = typer.Option(None, help="Model name (default: TIAN_MNEMONIC_MODEL or gpt-4o-mini)."),
+        base_url: Optional[str] = typer.Option(None, envvar="OPENAI_BASE_URL", help="API base URL (e.g. a local stub)."),
+        concurrency: int = typer.Option(16, help="Maximum requests in flight."),
+        retries: int = typer.Option(5),
+        limit: Optional[int] = typer.Option(None, help="Only fill the first N missing rows per table."),
+        no_build: bool = typer.Option(False, "--no-build", help="Only update output/mnemonics.json; skip the rebuild."),
+    ) -> None:
+        """Generate meaning/reading mnemonics for the output CSVs."""
+        from generate_mnemonics import DEFAULT_MODEL, KEY_COLUMNS, generate_mnemonics
+
+        generate_mnemonics(
+            [t.strip() for t in tables.split(",") if t.strip() in KEY_COLUMNS],
+            model=model or DEFAULT_MODEL,
+            base_url=base_url,
+            concurrency=concurrency,
+            retries=retries,
+            limit=limit,
+            build=not no_build,
+        )
+
+    return app
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["lookup"]:
+        parsed = parse_lookup_args(argv[1:])
+        if parsed is not None:
+            run_lookup_spec(*parsed)
+            return
+    build_app()(args=argv, prog_name="tian")
+
+
+if __name__ == "__main__":
+    main()
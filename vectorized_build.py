@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+"""
+DataFrame-backed level computation, sorting and CSV writing.
+
+Opt in with ``TIAN_VECTORIZED=1`` or ``build_hsk_csv.py --vectorized``. The
+stages still gather their per-entry columns as before; the tian levels are
+then derived by exploding each row's parts (components or characters) to long
+form, mapping their levels and taking a grouped max, and the table is sorted
+and written by pandas. The CSVs match the row-by-row path byte for byte.
+"""
+
+import importlib
+import os
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+from build_profile import PROFILER
+
+VECTORIZED_ENV = "TIAN_VECTORIZED"
+
+
+def vectorized_enabled() -> bool:
+    return os.environ.get(VECTORIZED_ENV, "").strip().lower() not in ("", "0", "false")
+
+
+def load_pandas():
+    try:
+        return importlib.import_module("pandas")
+    except Exception as exc:  # pragma: no cover
+        raise SystemExit(
+            "pandas is required for the vectorized build but not available. "
+            "Install dependencies in the project venv: "
+            "./venv/Scripts/python.exe -m pip install -r requirements.txt\n"
+            f"Original error: {exc}"
+        )
+
+
+def max_part_level(parts, part_levels: Dict[str, int], fallback):
+    """Per row, the highest level among its parts; ``fallback`` where none is known.
+
+    ``parts`` holds one list (or string) of parts per row, aligned with the
+    ``fallback`` Series.
+    """
+    pd = load_pandas()
+    long = pd.Series(parts, index=fallback.index, dtype=object).explode()
+    best = long.map(part_levels).groupby(level=0).max()
+    return best.reindex(fallback.index).fillna(fallback).astype("int64")
+
+
+def build_frame(
+    columns: Dict[str, Sequence[object]],
+    parts,
+    part_levels: Dict[str, int],
+    headers: List[str],
+    sort_by: List[str],
+):
+    """Assemble a table, derive ``tian_level`` from ``parts`` and sort it.
+
+    ``tian_level`` falls back to ``hsk_level``; headers missing from
+    ``columns`` are filled with empty strings.
+    """
+    pd = load_pandas()
+    with PROFILER.stage("vectorized.frame"):
+        frame = pd.DataFrame(columns)
+        frame["hsk_level"] = frame["hsk_level"].astype("int64")
+        frame["tian_level"] = max_part_level(parts, part_levels, frame["hsk_level"])
+        if "stroke_count" in frame.columns:
+            # Unknown counts are None: keep them empty cells, sorted last,
+            # rather than floats.
+            frame["stroke_count"] = frame["stroke_count"].astype("Int64")
+        for header in headers:
+            if header not in frame.columns:
+                frame[header] = ""
+        # Multi-key sorts in pandas are stable, matching list.sort.
+        return frame.sort_values(sort_by, kind="stable", ignore_index=True)[headers]
+
+
+def write_frame(frame, path: Path) -> None:
+    """Write a table the way write_csv does (CRLF line endings, atomic rename)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with PROFILER.stage(f"write_csv.{path.name}"):
+        frame.to_csv(tmp_path, index=False, lineterminator="\r\n", encoding="utf-8")
+    os.replace(tmp_path, path)
@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+"""
+Watch the HSK lists and Anki exports and rebuild only what a change affects.
+
+    python build_hsk_csv.py --watch
+    python tian.py build --watch --interval 0.5
+
+A WatchSession keeps the hanzipy objects, the component graph, the parsed
+Anki files and every built row in memory. Each poll compares the inputs'
+(mtime, size); on a change only those files are re-read, only characters not
+seen before are decomposed and looked up, and only rows whose own entry or
+stored mnemonics changed, or whose parts moved level, are recomputed. Radical levels are
+re-derived on any hanzi list change (productivity order is global, but cheap
+once decompositions are resident) and level changes then propagate to the
+hanzi and vocabulary rows. Tables with changed rows are rewritten atomically.
+"""
+
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from build_hsk_csv import SharedHanzipy, record_stages
+from build_hsk_hanzi_csv import (
+    HANZI_HEADERS,
+    HanziEntry,
+    get_components,
+    hanzi_row,
+    hanzi_sort_key,
+    tian_level_from_components,
+)
+from build_hsk_vocab_csv import (
+    VOCAB_HEADERS,
+    anki_sources,
+    load_anki_file,
+    merge_anki_files,
+    normalize_vocab_key,
+    tian_level_from_chars,
+    vocab_row,
+    vocab_sort_key,
+)
+from build_profile import PROFILER
+from build_radicals_csv import extract_radicals, radical_rows, radicals_headers
+from component_graph import ComponentGraph, load_component_graph
+from hsk_csv_utils import (
+    LEVELS,
+    MNEMONICS_PATH,
+    hanzi_sources,
+    load_mnemonics,
+    output_path,
+    read_level_entries,
+    tian_levels,
+    word_sources,
+    write_csv,
+)
+from lexicon_records import AnkiEntry, HanziRecord, RadicalRecord, VocabRecord
+from row_changelog import record_table
+
+Signature = Tuple[int, int]
+# Input kind -> levels whose file changed.
+Changes = Dict[str, List[int]]
+
+
+def file_signature(path: Path) -> Optional[Signature]:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def changed_keys(old: Dict[str, object], new: Dict[str, object]) -> Set[str]:
+    """Keys added, removed or mapped to a different value."""
+    return {key for key in old.keys() | new.keys() if old.get(key) != new.get(key)}
+
+
+def changed_copies(old: List[Tuple[int, str]], new: List[Tuple[int, str]]) -> int:
+    """Rows added or dropped between two key lists, counting repeated keys once per copy."""
+    old_counts, new_counts = Counter(old), Counter(new)
+    return sum((old_counts - new_counts).values()) + sum((new_counts - old_counts).values())
+
+
+class WatchSession:
+    """Resident build state for one level range."""
+
+    def __init__(self, levels: List[int] = LEVELS) -> None:
+        self.levels = levels
+        self.hanzipy = SharedHanzipy()
+        self.signatures: Dict[Path, Optional[Signature]] = {}
+        self.hanzi_lists: Dict[int, List[str]] = {}
+        self.word_lists: Dict[int, List[str]] = {}
+        self.anki_files: Dict[int, List[Tuple[str, str, AnkiEntry]]] = {}
+        self.anki_data: Dict[str, AnkiEntry] = {}
+        self.mnemonics: Dict[str, Dict[str, Dict[str, str]]] = {"hanzi": {}, "vocabulary": {}}
+        # Per character: its radical-table components and its hanzi entry.
+        self.radical_parts: Dict[str, List[str]] = {}
+        self.entries: Dict[str, HanziEntry] = {}
+        self.graph: Optional[ComponentGraph] = None
+        self.component_levels: Dict[str, int] = {}
+        self.hanzi_levels: Dict[str, int] = {}
+        self.radicals: List[RadicalRecord] = []
+        # Row keys in table order; a list may repeat an entry, and the
+        # tables keep one row per occurrence.
+        self.hanzi_keys: List[Tuple[int, str]] = []
+        self.vocab_keys: List[Tuple[int, str]] = []
+        self.hanzi_rows: Dict[Tuple[int, str], HanziRecord] = {}
+        self.vocab_rows: Dict[Tuple[int, str], VocabRecord] = {}
+
+    def sources(self) -> Dict[Path, Tuple[str, int]]:
+        """Every watched input file, mapped to (kind, HSK level)."""
+        sources: Dict[Path, Tuple[str, int]] = {}
+        for kind, paths in (
+            ("hanzi", hanzi_sources(self.levels)),
+            ("words", word_sources(self.levels)),
+            ("anki", anki_sources(self.levels)),
+        ):
+            for level, path in zip(self.levels, paths):
+                sources[path] = (kind, level)
+        sources[MNEMONICS_PATH] = ("mnemonics", 0)
+        return sources
+
+    def poll(self) -> Changes:
+        """Levels whose inputs changed since the last poll (all of them on the first)."""
+        changes: Changes = {"hanzi": [], "words": [], "anki": [], "mnemonics": []}
+        for path, (kind, level) in self.sources().items():
+            signature = file_signature(path)
+            if path not in self.signatures or self.signatures[path] != signature:
+                self.signatures[path] = signature
+                changes[kind].append(level)
+        return changes
+
+    def update(self, changes: Changes, write: bool = True) -> Dict[str, int]:
+        """Re-read the changed inputs and rebuild the rows they affect.
+
+        Returns the number of changed rows per table; each table with any
+        is rewritten when ``write`` is set.
+        """
+        changed = {"radicals": 0, "hanzi": 0, "vocabulary": 0}
+        with PROFILER.stage("watch.update"):
+            stale: Dict[str, Set[str]] = {"hanzi": set(), "vocabulary": set()}
+            if changes["mnemonics"]:
+                for table in stale:
+                    mnemonics = load_mnemonics(table)
+                    stale[table] = changed_keys(self.mnemonics[table], mnemonics)
+                    self.mnemonics[table] = mnemonics
+            moved_hanzi: Set[str] = set()
+            if changes["hanzi"] or stale["hanzi"]:
+                changed["radicals"], changed["hanzi"], moved_hanzi = self.update_hanzi(
+                    changes["hanzi"], stale["hanzi"], write
+                )
+            changed["vocabulary"] = self.update_vocabulary(
+                changes["words"], changes["anki"], stale["vocabulary"], moved_hanzi, write
+            )
+            self.hanzipy.decomposer.save()
+            self.hanzipy.dictionary.save()
+            if write:
+                for table, rows in changed.items():
+                    if rows:
+                        record_table(table, self.levels)
+                # Every table now matches its inputs, so the next full build
+                # can skip all three stages.
+                record_stages(self.levels)
+        return changed
+
+    def update_hanzi(self, levels: List[int], stale: Set[str], write: bool) -> Tuple[int, int, Set[str]]:
+        decomposer, dictionary = self.hanzipy.decomposer, self.hanzipy.dictionary
+        for level in levels:
+            self.hanzi_lists[level] = read_level_entries(hanzi_sources([level])[0])
+
+        new = [hanzi for hanzi in dict.fromkeys(self.all_hanzi()) if hanzi not in self.entries]
+        dictionary.lookup_many(new)
+        for hanzi in new:
+            self.radical_parts[hanzi] = extract_radicals(hanzi, decomposer)
+            self.entries[hanzi] = (hanzi, dictionary.pinyins(hanzi), get_components(hanzi, decomposer))
+
+        per_level = [[(hanzi, self.radical_parts[hanzi]) for hanzi in self.hanzi_lists[level]] for level in self.levels]
+        radicals = radical_rows(per_level, decomposer, self.levels, self.hanzipy.strokes)
+        changed_radicals = len(
+            changed_keys({r.radical: r for r in self.radicals}, {r.radical: r for r in radicals})
+        )
+        self.radicals = radicals
+        if changed_radicals and write:
+            write_csv(radicals, radicals_headers(self.levels), output_path("radicals", self.levels))
+
+        # The radical table can change, so the walk covers every component
+        # again; already walked nodes cost a dict lookup.
+        radical_levels = tian_levels(radicals, "radical")
+        roots = [c for hanzi in dict.fromkeys(self.all_hanzi()) for c in self.entries[hanzi][2]]
+        if self.graph is None:
+            self.graph = load_component_graph(roots, decomposer, radical_levels)
+        else:
+            self.graph = ComponentGraph.build(roots, decomposer, self.graph.edges, radical_levels)
+        component_levels = self.graph.resolve_levels(radical_levels)
+        stroke_counts = self.hanzipy.strokes.counts(self.all_hanzi())
+        self.hanzipy.strokes.save()
+        moved = changed_keys(self.component_levels, component_levels)
+        self.component_levels = component_levels
+
+        keys = [(level, hanzi) for level in self.levels for hanzi in self.hanzi_lists[level]]
+        rows: Dict[Tuple[int, str], HanziRecord] = {}
+        changed_rows = changed_copies(self.hanzi_keys, keys)
+        for key in keys:
+            level, hanzi = key
+            row = self.hanzi_rows.get(key)
+            components = self.entries[hanzi][2]
+            if row is None or hanzi in stale:
+                new_row = hanzi_row(
+                    self.entries[hanzi], level, component_levels, stroke_counts, self.mnemonics["hanzi"]
+                )
+                if new_row != row:
+                    changed_rows += row is not None
+                    row = new_row
+            elif any(c in moved for c in components):
+                tian_level = tian_level_from_components(components, component_levels, level)
+                if tian_level != row.tian_level:
+                    row.tian_level = tian_level
+                    changed_rows += 1
+            rows[key] = row
+        self.hanzi_keys = keys
+        self.hanzi_rows = rows
+
+        table = sorted((rows[key] for key in keys), key=hanzi_sort_key)
+        if changed_rows and write:
+            write_csv(table, HANZI_HEADERS, output_path("hanzi", self.levels))
+        hanzi_levels = tian_levels(table, "hanzi")
+        moved_hanzi = changed_keys(self.hanzi_levels, hanzi_levels)
+        self.hanzi_levels = hanzi_levels
+        return changed_radicals, changed_rows, moved_hanzi
+
+    def update_vocabulary(
+        self, word_levels: List[int], anki_levels: List[int], stale: Set[str], moved_hanzi: Set[str], write: bool
+    ) -> int:
+        for level in word_levels:
+            self.word_lists[level] = read_level_entries(word_sources([level])[0])
+        stale = set(stale)
+        if anki_levels:
+            for level in anki_levels:
+                path = anki_sources([level])[0]
+                self.anki_files[level] = load_anki_file(path) if path.exists() else []
+            anki_data = merge_anki_files([self.anki_files[level] for level in self.levels])
+            stale |= changed_keys(self.anki_data, anki_data)
+            self.anki_data = anki_data
+        if not (word_levels or stale or moved_hanzi):
+            return 0
+
+        keys = [(level, vocab) for level in self.levels for vocab in self.word_lists[level]]
+        rows: Dict[Tuple[int, str], VocabRecord] = {}
+        changed_rows = changed_copies(self.vocab_keys, keys)
+        for key in keys:
+            level, vocab = key
+            row = self.vocab_rows.get(key)
+            if row is None or vocab in stale or normalize_vocab_key(vocab) in stale:
+                new_row = vocab_row(vocab, level, self.anki_data, self.hanzi_levels, self.mnemonics["vocabulary"])
+                if new_row != row:
+                    changed_rows += row is not None
+                    row = new_row
+            elif any(ch in moved_hanzi for ch in vocab):
+                tian_level = tian_level_from_chars(vocab, self.hanzi_levels, level)
+                if tian_level != row.tian_level:
+                    row.tian_level = tian_level
+                    changed_rows += 1
+            rows[key] = row
+        self.vocab_keys = keys
+        self.vocab_rows = rows
+
+        if changed_rows and write:
+            table = sorted((rows[key] for key in keys), key=vocab_sort_key)
+            write_csv(table, VOCAB_HEADERS, output_path("vocabulary", self.levels))
+        return changed_rows
+
+    def all_hanzi(self) -> List[str]:
+        return [hanzi for level in self.levels for hanzi in self.hanzi_lists[level]]
+
+
+def watch(levels: List[int] = LEVELS, interval: float = 0.5) -> None:
+    """Build once, then poll the inputs every ``interval`` seconds until interrupted."""
+    session = WatchSession(levels)
+    print(f"Watching {len(session.sources())} input files every {interval}s (Ctrl+C to stop)")
+    try:
+        while True:
+            changes = session.poll()
+            if any(changes.values()):
+                started = time.perf_counter()
+                changed = session.update(changes)
+                summary = ", ".join(f"{table}: {count}" for table, count in changed.items())
+                print(f"Changed rows ({summary}) in {time.perf_counter() - started:.2f}s")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass